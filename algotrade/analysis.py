@@ -0,0 +1,68 @@
+"""Single-asset buy-and-hold analysis behind the backtesting page."""
+import numpy as np
+
+from algotrade.backtest import TRADING_DAYS
+from algotrade.drawdown import underwater_curve
+from algotrade.incremental import RunningStats
+from algotrade.metrics import risk_metrics
+
+
+def day_clock(index):
+    """Day numbers of a DatetimeIndex, the clock ``RunningStats`` measures durations with"""
+    return np.asarray(index.values, dtype='datetime64[D]').astype(np.int64)
+
+
+def calculate_returns(data, investment_amount, benchmark=None, periods_per_year=TRADING_DAYS, stats=None):
+    """Calculate investment returns with additional metrics.
+
+    ``periods_per_year`` is the number of bars per year (for intraday bars).
+    ``stats`` is a ``RunningStats`` already extended to ``data['Close']`` (see
+    ``extend_stats``); the high/low, volatility, drawdown and day count are
+    read from it, so moving the end date only folds in the new bars.
+    """
+    if data is None or len(data) == 0:
+        return None
+
+    close = data['Close'].to_numpy(dtype=float)
+    if stats is None:
+        stats = RunningStats().update(close, day_clock(data.index))
+
+    start_price = data['Close'].iloc[0]
+    end_price = data['Close'].iloc[-1]
+    shares_bought = investment_amount / start_price
+    final_value = shares_bought * end_price
+    total_return = final_value - investment_amount
+    return_percentage = (total_return / investment_amount) * 100
+
+    # Additional metrics
+    max_price = stats.high
+    min_price = stats.low
+    max_value = shares_bought * max_price
+    min_value = shares_bought * min_price
+
+    # Risk statistics (annualized volatility, Sharpe, beta, ...) over the period returns
+    metrics = risk_metrics(data['Close'], benchmark, periods_per_year=periods_per_year, stats=stats)
+    volatility = metrics['volatility']
+
+    # Drawdown measured from the running peak, so a low before the high doesn't count;
+    # the underwater curve is only the chart's data
+    drawdown = stats.drawdown(data.index)
+    drawdown['underwater'] = underwater_curve(close)
+
+    return {
+        'start_price': start_price,
+        'end_price': end_price,
+        'shares_bought': shares_bought,
+        'final_value': final_value,
+        'total_return': total_return,
+        'return_percentage': return_percentage,
+        'max_value': max_value,
+        'min_value': min_value,
+        'max_price': max_price,
+        'min_price': min_price,
+        'volatility': volatility,
+        'drawdown': drawdown,
+        'metrics': metrics,
+        # Distinct dates, so intraday bars don't count as extra days
+        'days_held': stats.days
+    }
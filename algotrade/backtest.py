@@ -0,0 +1,168 @@
+"""Multi-asset backtesting over an aligned date x asset price matrix.
+
+Price histories are aligned once into a NumPy matrix (one row per date, one
+column per asset). Portfolio value, returns, volatility and drawdown are then
+computed with whole-matrix operations instead of one asset at a time.
+"""
+import numpy as np
+import pandas as pd
+
+from algotrade.drawdown import underwater_curve
+
+TRADING_DAYS = 252
+
+
+def align_closes(frames):
+    """Align {symbol: OHLCV frame or Close series} into one price matrix.
+
+    Returns ``(dates, symbols, prices, observed)``: ``prices`` has shape
+    (dates, symbols), is NaN before an asset's first bar and forward-filled after
+    it (so weekends in crypto histories don't break stock columns). ``observed``
+    marks the cells that are real bars rather than forward-filled ones.
+    """
+    columns = {}
+    for symbol, data in frames.items():
+        if data is None or len(data) == 0:
+            continue
+        close = data['Close'] if isinstance(data, pd.DataFrame) else data
+        index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        series = pd.Series(np.asarray(close, dtype=float), index=index.normalize())
+        columns[symbol] = series[~series.index.duplicated(keep='last')]
+    if not columns:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty((0, 0), dtype=bool)
+    table = pd.concat(columns, axis=1).sort_index()
+    observed = table.notna().to_numpy()
+    table = table.ffill()
+    return table.index, list(table.columns), table.to_numpy(dtype=float), observed
+
+
+def first_valid_rows(prices):
+    """Row index of each column's first non-NaN price"""
+    return np.argmax(~np.isnan(prices), axis=0)
+
+
+def rank_assets(prices, symbols, observed=None, amount=1000.0, periods_per_year=TRADING_DAYS):
+    """Rank every column by total return, with volatility and max drawdown.
+
+    Each asset is measured from its own first bar, and all statistics come from
+    column-wise passes over the matrix. Returns on forward-filled rows (days an
+    asset did not trade) are left out of its volatility.
+    """
+    first = first_valid_rows(prices)
+    columns = np.arange(prices.shape[1])
+    start_prices = prices[first, columns]
+    end_prices = prices[-1]
+
+    # Before an asset's first bar, pretend it sat at its start price
+    filled = np.where(np.isnan(prices), start_prices, prices)
+    daily = filled[1:] / filled[:-1] - 1
+    daily[np.arange(1, len(prices))[:, None] <= first] = np.nan
+    if observed is not None:
+        daily[~observed[1:]] = np.nan
+    with np.errstate(invalid='ignore'):
+        volatility = np.nanstd(daily, axis=0, ddof=1) * np.sqrt(periods_per_year) * 100
+    max_drawdown = underwater_curve(filled).min(axis=0) * 100
+
+    table = pd.DataFrame({
+        'Symbol': symbols,
+        'Start Price': start_prices,
+        'End Price': end_prices,
+        'Final Value': amount * end_prices / start_prices,
+        'Total Return %': (end_prices / start_prices - 1) * 100,
+        'Volatility %': volatility,
+        'Max Drawdown %': max_drawdown,
+    })
+    return table.sort_values('Total Return %', ascending=False).reset_index(drop=True)
+
+
+FREQUENCIES = {'Monthly': 'M', 'Quarterly': 'Q'}
+
+
+def schedule_rows(dates, frequency):
+    """Rows holding the first trading day of each month or quarter (never row 0).
+
+    ``frequency`` is 'Monthly', 'Quarterly' or None for no schedule.
+    """
+    if not frequency or frequency not in FREQUENCIES or len(dates) < 2:
+        return np.array([], dtype=int)
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    periods = dates.to_period(FREQUENCIES[frequency]).asi8
+    return np.flatnonzero(periods[1:] != periods[:-1]) + 1
+
+
+def simulate_plan(prices, weights, dates, initial, contribution=0.0,
+                  contribution_frequency='Monthly', rebalance_frequency=None,
+                  periods_per_year=TRADING_DAYS):
+    """Lump sum plus recurring contributions, with optional periodic rebalancing.
+
+    New money is always split by the target weights. On rebalance dates the
+    whole portfolio is reset to the target weights. Between rebalances the
+    portfolio value follows the linear recurrence ``V[k+1] = g[k] * V[k] + d[k]``
+    (growth of the rebalanced basket plus the value of new deposits), which is
+    solved with cumulative products and sums instead of a per-day loop.
+    """
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    start = int(first_valid_rows(prices).max())
+    held = prices[start:]
+    dates = dates[start:]
+    n_rows = len(held)
+
+    # Deposits per row (row 0 is the initial lump sum)
+    contrib_rows = schedule_rows(dates, contribution_frequency) if contribution > 0 else np.array([], dtype=int)
+    deposits = np.zeros(n_rows)
+    deposits[0] = initial
+    deposits[contrib_rows] += contribution
+
+    rebalance_rows = np.concatenate([[0], schedule_rows(dates, rebalance_frequency)]).astype(int)
+    is_rebalance = np.zeros(n_rows, dtype=bool)
+    is_rebalance[rebalance_rows] = True
+
+    # Shares bought by deposits that land between rebalance dates
+    added_shares = np.zeros_like(held)
+    between = contrib_rows[~is_rebalance[contrib_rows]]
+    added_shares[between] = contribution * weights / held[between]
+    cum_added = np.cumsum(added_shares, axis=0)
+
+    # Value right after each rebalance: V[k+1] = g[k] * V[k] + d[k]
+    seg_prices = held[rebalance_rows]
+    growth = (seg_prices[1:] / seg_prices[:-1]) @ weights
+    if len(rebalance_rows) > 1:
+        inside = cum_added[rebalance_rows[1:]] - cum_added[rebalance_rows[:-1]]
+        new_money = np.sum(inside * seg_prices[1:], axis=1) + deposits[rebalance_rows[1:]]
+    else:
+        new_money = np.array([])
+    cum_growth = np.concatenate([[1.0], np.cumprod(growth)])
+    rebalanced_value = cum_growth * (deposits[0] + np.concatenate([[0.0], np.cumsum(new_money / cum_growth[1:])]))
+
+    # Daily holdings: rebalanced base position plus deposits since that rebalance
+    segment = np.searchsorted(rebalance_rows, np.arange(n_rows), side='right') - 1
+    base_shares = rebalanced_value[:, None] * weights / seg_prices
+    shares = base_shares[segment] + cum_added - cum_added[rebalance_rows][segment]
+    values = np.sum(shares * held, axis=1)
+    invested = np.cumsum(deposits)
+
+    # Time-weighted returns strip out deposits so volatility reflects the assets only
+    returns = (values[1:] - deposits[1:]) / values[:-1] - 1
+    index = np.concatenate([[1.0], np.cumprod(1 + returns)])
+    volatility = returns.std(ddof=1) * np.sqrt(periods_per_year) * 100 if len(returns) > 1 else 0.0
+    total_invested = float(invested[-1])
+
+    return {
+        'start_row': start,
+        'dates': dates,
+        'values': values,
+        'invested': invested,
+        'shares': shares,
+        'returns': returns,
+        'final_value': float(values[-1]),
+        'total_invested': total_invested,
+        'profit': float(values[-1] - total_invested),
+        'return_percentage': float((values[-1] / total_invested - 1) * 100),
+        'contributions': int(len(contrib_rows)),
+        'rebalances': int(len(rebalance_rows) - 1),
+        'volatility': float(volatility),
+        'max_drawdown': float(underwater_curve(index).min() * 100),
+    }
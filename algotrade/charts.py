@@ -0,0 +1,55 @@
+"""Plotly line traces capped at a fixed number of points.
+
+Long histories are split into equal buckets and only the lowest and highest
+point of each bucket is kept (plus the first and last point). The line looks
+the same at screen resolution, every peak and trough -- including the overall
+maximum and minimum -- stays exactly where it was, and the JSON sent to the
+browser no longer grows with the length of the series.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Roughly two points per horizontal pixel of a wide chart
+MAX_POINTS = 2000
+
+
+def minmax_indices(y, max_points=MAX_POINTS):
+    """Sorted row numbers to keep so that at most ``max_points`` remain"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max(max_points // 2 - 1, 1)
+    size = -(-n // buckets)
+    blocks = np.full(buckets * size, np.nan)
+    blocks[:n] = y
+    blocks = blocks.reshape(buckets, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(buckets) * size
+    low = offsets + np.where(missing, np.inf, blocks).argmin(axis=1)
+    high = offsets + np.where(missing, -np.inf, blocks).argmax(axis=1)
+    keep = np.concatenate([[0, n - 1], low, high])
+    return np.unique(keep[keep < n])
+
+
+def _take(values, rows):
+    if isinstance(values, pd.Index):
+        return values[rows]
+    if isinstance(values, pd.Series):
+        return values.iloc[rows]
+    return np.asarray(values)[rows]
+
+
+def decimate(x, y, max_points=MAX_POINTS):
+    """Downsample matching x/y sequences, keeping each bucket's min and max"""
+    rows = minmax_indices(y, max_points)
+    if len(rows) == len(y):
+        return x, y
+    return _take(x, rows), _take(y, rows)
+
+
+def line_trace(x, y, max_points=MAX_POINTS, **kwargs):
+    """A ``go.Scatter`` for a long series, decimated to at most ``max_points``"""
+    x, y = decimate(x, y, max_points)
+    return go.Scatter(x=x, y=y, **kwargs)
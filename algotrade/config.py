@@ -0,0 +1,7 @@
+"""Shared configuration for the AlgoTrade helper package."""
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Where downloaded market data is kept between app restarts
+DATA_DIR = os.environ.get('ALGOTRADE_DATA_DIR', os.path.join(PROJECT_ROOT, '.algotrade_data'))
@@ -0,0 +1,75 @@
+"""Drawdown analysis built on a running-maximum accumulation.
+
+A drawdown is measured from the highest value seen *so far*, never from a peak
+that comes later in time. Everything here is a single O(n) vectorized pass, so
+it stays cheap on decades of daily bars.
+"""
+import numpy as np
+
+
+def underwater_curve(values):
+    """Fraction below the running peak at every point (0 at new highs), along axis 0"""
+    values = np.asarray(values, dtype=float)
+    peaks = np.maximum.accumulate(values, axis=0)
+    return values / peaks - 1
+
+
+def _elapsed(index, start_row, end_row):
+    """Calendar days between two rows if ``index`` holds dates, else the row count"""
+    if index is None:
+        return int(end_row - start_row)
+    return int((index[end_row] - index[start_row]).days)
+
+
+def drawdown_analysis(values, index=None):
+    """Max drawdown with its peak, trough, recovery and durations.
+
+    ``values`` is a price or portfolio value series; ``index`` (optional) holds
+    matching dates so durations are reported in calendar days. Dates in the
+    result are None when there is no drawdown or no recovery yet.
+    """
+    values = np.asarray(values, dtype=float)
+    rows = np.arange(len(values))
+    underwater = underwater_curve(values)
+    at_high = underwater >= 0
+
+    # Each stretch under water runs from the last high to the next one (or the last bar)
+    under = ~at_high
+    starts = np.flatnonzero(under[1:] & ~under[:-1])
+    ends = np.flatnonzero(under[:-1] & ~under[1:]) + 1
+    if len(values) and under[-1]:
+        ends = np.append(ends, len(values) - 1)
+    clock = rows if index is None else np.asarray(index.values, dtype='datetime64[D]').astype(np.int64)
+    longest_days = int((clock[ends] - clock[starts]).max()) if len(starts) else 0
+    last_high = np.maximum.accumulate(np.where(at_high, rows, 0))
+
+    result = {
+        'underwater': underwater,
+        'max_drawdown': 0.0,
+        'peak_date': None,
+        'trough_date': None,
+        'recovery_date': None,
+        'drawdown_days': 0,
+        'recovery_days': None,
+        'underwater_days': 0,
+        'longest_underwater_days': longest_days,
+    }
+    if len(values) == 0 or underwater.min() >= 0:
+        return result
+
+    trough = int(np.argmin(underwater))
+    peak = int(last_high[trough])
+    recovered = np.flatnonzero(at_high[trough:])
+    recovery = trough + int(recovered[0]) if len(recovered) else None
+
+    label = (lambda row: index[row]) if index is not None else (lambda row: row)
+    result.update({
+        'max_drawdown': float(underwater[trough] * 100),
+        'peak_date': label(peak),
+        'trough_date': label(trough),
+        'recovery_date': label(recovery) if recovery is not None else None,
+        'drawdown_days': _elapsed(index, peak, trough),
+        'recovery_days': _elapsed(index, trough, recovery) if recovery is not None else None,
+        'underwater_days': _elapsed(index, peak, recovery if recovery is not None else len(values) - 1),
+    })
+    return result
@@ -0,0 +1,168 @@
+"""Summary statistics that are extended as new bars arrive.
+
+When the end date moves forward by a few days only the new bars need to be
+folded in: the count, mean and variance of returns (Welford's algorithm, merged
+a chunk at a time), the downside sum of squares, the highest and lowest price,
+the running peak and the worst drawdown episode (peak, trough, recovery and the
+longest stretch under water) are all kept as running state. Appending costs
+O(new bars) instead of O(history).
+
+An optional ``clock`` (e.g. day numbers) measures durations and counts distinct
+days; without one, rows are counted.
+"""
+import numpy as np
+
+from algotrade.backtest import TRADING_DAYS
+
+
+class RunningStats:
+    """Running high/low, drawdown and return mean/variance of a price series"""
+
+    def __init__(self):
+        self.count = 0              # prices seen
+        self.first = None
+        self.last = None
+        self.high = -np.inf
+        self.low = np.inf
+        self.peak = -np.inf         # running maximum, the drawdown reference
+        self.max_drawdown = 0.0     # worst fraction below the peak so far (<= 0)
+        self.n_returns = 0
+        self.mean = 0.0             # mean period return
+        self.m2 = 0.0               # sum of squared deviations from the mean
+        self.downside_sq = 0.0      # sum of squared negative returns
+        self.first_clock = None
+        self.last_clock = None
+        self.days = 0               # distinct clock values seen
+        self.high_row = None        # (row, clock) of the last price at its running peak
+        self.high_clock = None
+        self.drawdown_peak = None   # (row, clock) of the peak, trough and recovery of the worst drawdown
+        self.trough = None
+        self.recovery = None
+        self.longest_closed = 0     # longest finished stretch under water, in clock units
+
+    def update(self, prices, clock=None):
+        """Fold a chunk of new prices (in time order) into the statistics"""
+        prices = np.asarray(prices, dtype=float)
+        if len(prices) == 0:
+            return self
+        rows = np.arange(self.count, self.count + len(prices))
+        clock = rows if clock is None else np.asarray(clock, dtype=np.int64)
+
+        chained = prices if self.last is None else np.concatenate([[self.last], prices])
+        returns = chained[1:] / chained[:-1] - 1
+        self._merge_returns(returns)
+        self.downside_sq += float((np.minimum(returns, 0) ** 2).sum())
+
+        peaks = np.maximum.accumulate(np.maximum(prices, self.peak))
+        self._track_drawdown(prices / peaks - 1, rows, clock)
+        self.peak = float(peaks[-1])
+        self.high = max(self.high, float(prices.max()))
+        self.low = min(self.low, float(prices.min()))
+        if self.first is None:
+            self.first = float(prices[0])
+            self.first_clock = int(clock[0])
+        chained_clock = clock if self.last_clock is None else np.concatenate([[self.last_clock], clock])
+        self.days += int(np.count_nonzero(np.diff(chained_clock))) + (self.last_clock is None)
+        self.last = float(prices[-1])
+        self.last_clock = int(clock[-1])
+        self.count += len(prices)
+        return self
+
+    def _track_drawdown(self, underwater, rows, clock):
+        at_high = underwater >= 0
+        high_rows, high_clocks = rows[at_high], clock[at_high]
+
+        # A stretch under water ends at the first new high after it
+        if self.high_row is not None:
+            high_rows = np.concatenate([[self.high_row], high_rows])
+            high_clocks = np.concatenate([[self.high_clock], high_clocks])
+        closed = np.diff(high_rows) > 1
+        if closed.any():
+            self.longest_closed = max(self.longest_closed, int(np.diff(high_clocks)[closed].max()))
+
+        # Earliest worst point wins, as with argmin over the whole series
+        trough = int(np.argmin(underwater))
+        if underwater[trough] < self.max_drawdown:
+            self.max_drawdown = float(underwater[trough])
+            self.trough = (int(rows[trough]), int(clock[trough]))
+            before = np.flatnonzero(at_high[:trough + 1])
+            self.drawdown_peak = ((int(rows[before[-1]]), int(clock[before[-1]])) if len(before)
+                                  else (self.high_row, self.high_clock))
+            after = np.flatnonzero(at_high[trough:])
+            self.recovery = (int(rows[trough + after[0]]), int(clock[trough + after[0]])) if len(after) else None
+        elif self.trough is not None and self.recovery is None and at_high.any():
+            first = int(np.argmax(at_high))
+            self.recovery = (int(rows[first]), int(clock[first]))
+
+        if len(high_rows):
+            self.high_row, self.high_clock = int(high_rows[-1]), int(high_clocks[-1])
+
+    def _merge_returns(self, returns):
+        # Chan et al. pairwise update: combine (n, mean, M2) of the chunk with the running ones
+        n_b = len(returns)
+        if n_b == 0:
+            return
+        mean_b = returns.mean()
+        m2_b = float(((returns - mean_b) ** 2).sum())
+        n = self.n_returns + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta ** 2 * self.n_returns * n_b / n
+        self.n_returns = n
+
+    @property
+    def variance(self):
+        """Sample variance of the period returns"""
+        return self.m2 / (self.n_returns - 1) if self.n_returns > 1 else 0.0
+
+    def volatility(self, periods_per_year=TRADING_DAYS):
+        """Annualized volatility of the returns in percent"""
+        return float(np.sqrt(self.variance * periods_per_year) * 100)
+
+    def drawdown(self, index=None):
+        """Worst drawdown in the format of ``drawdown_analysis`` (without the underwater curve).
+
+        ``index`` labels rows with dates; durations are in clock units.
+        """
+        under_now = self.last is not None and self.last < self.peak
+        ongoing = self.last_clock - self.high_clock if under_now else 0
+        result = {
+            'max_drawdown': 0.0,
+            'peak_date': None,
+            'trough_date': None,
+            'recovery_date': None,
+            'drawdown_days': 0,
+            'recovery_days': None,
+            'underwater_days': 0,
+            'longest_underwater_days': max(self.longest_closed, ongoing),
+        }
+        if self.trough is None:
+            return result
+        label = (lambda row: index[row]) if index is not None else (lambda row: row)
+        (peak_row, peak_clock), (trough_row, trough_clock) = self.drawdown_peak, self.trough
+        end_clock = self.recovery[1] if self.recovery is not None else self.last_clock
+        result.update({
+            'max_drawdown': self.max_drawdown * 100,
+            'peak_date': label(peak_row),
+            'trough_date': label(trough_row),
+            'recovery_date': label(self.recovery[0]) if self.recovery is not None else None,
+            'drawdown_days': trough_clock - peak_clock,
+            'recovery_days': self.recovery[1] - trough_clock if self.recovery is not None else None,
+            'underwater_days': end_clock - peak_clock,
+        })
+        return result
+
+
+def extend_stats(stats, prices, clock=None):
+    """Bring ``stats`` up to date with a price series that grew at the end.
+
+    Only the prices after the ones already counted are folded in. If the series
+    does not start with the same prices (a different start date or an end date
+    moved backwards), the statistics are rebuilt from scratch.
+    """
+    prices = np.asarray(prices, dtype=float)
+    seen = stats.count if stats is not None else 0
+    if (stats is None or seen > len(prices) or
+            (seen and (prices[0] != stats.first or prices[seen - 1] != stats.last))):
+        return RunningStats().update(prices, clock)
+    return stats.update(prices[seen:], None if clock is None else np.asarray(clock)[seen:])
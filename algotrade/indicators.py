@@ -0,0 +1,69 @@
+"""Technical indicators over NumPy price arrays.
+
+Every indicator is a single O(n) pass: simple moving averages and rolling
+standard deviations come from one cumulative sum, and exponential averages use
+pandas' compiled ``ewm`` recursion. Values are NaN until enough bars exist.
+"""
+import numpy as np
+import pandas as pd
+
+from algotrade.metrics import _window_sums
+
+
+def sma(values, window):
+    """Simple moving average"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        out[window - 1:] = _window_sums(values, window) / window
+    return out
+
+
+def rolling_std(values, window):
+    """Rolling population standard deviation (as used for Bollinger Bands)"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        mean = _window_sums(values, window) / window
+        variance = _window_sums(values ** 2, window) / window - mean ** 2
+        out[window - 1:] = np.sqrt(np.clip(variance, 0, None))
+    return out
+
+
+def ema(values, span):
+    """Exponential moving average with smoothing 2 / (span + 1)"""
+    values = np.asarray(values, dtype=float)
+    out = pd.Series(values).ewm(span=span, adjust=False, min_periods=span).mean().to_numpy()
+    return out
+
+
+def rsi(values, window=14):
+    """Relative Strength Index (Wilder's smoothing), 0 to 100"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return out
+    change = np.diff(values)
+    gains = pd.Series(np.clip(change, 0, None)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    losses = pd.Series(np.clip(-change, 0, None)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = 100 - 100 / (1 + gains.to_numpy() / losses.to_numpy())
+    out[1:][(losses.to_numpy() == 0) & ~np.isnan(gains.to_numpy())] = 100.0
+    return out
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    line = ema(values, fast) - ema(values, slow)
+    signal_line = np.full(len(line), np.nan)
+    valid = ~np.isnan(line)
+    if valid.sum() >= signal:
+        signal_line[valid] = ema(line[valid], signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(values, window=20, width=2.0):
+    """Middle, upper and lower Bollinger Band"""
+    middle = sma(values, window)
+    spread = width * rolling_std(values, window)
+    return middle, middle + spread, middle - spread
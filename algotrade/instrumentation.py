@@ -0,0 +1,240 @@
+"""Per-rerun timing spans for the Streamlit pages.
+
+Streamlit reruns a page script from the top on every widget change. Each page
+calls ``begin_rerun`` at the top and ``finish_rerun`` at the bottom, and wraps
+the interesting work in ``span`` blocks (data fetch, metric computation,
+figure build, HTML rendering). Cache lookups are counted with ``record_cache``.
+
+Finished reruns are exported to ``ALGOTRADE_METRICS_DIR`` (default
+``.algotrade_data/metrics``) as a JSON-lines span log and a Prometheus-style
+text file, and can be shown in an optional sidebar debug panel
+(``?debug=1`` in the URL or ``ALGOTRADE_DEBUG=1``).
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from algotrade.config import DATA_DIR
+
+METRICS_DIR = os.environ.get('ALGOTRADE_METRICS_DIR', os.path.join(DATA_DIR, 'metrics'))
+EXPORT_ENABLED = os.environ.get('ALGOTRADE_METRICS', 'on').lower() not in ('0', 'off', 'false')
+SPAN_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+# Streamlit runs each session's script in its own thread
+_local = threading.local()
+
+# Process-wide aggregates for the Prometheus export
+_totals_lock = threading.Lock()
+_span_totals = defaultdict(lambda: [0, 0.0])    # (page, span) -> [count, seconds]
+_cache_totals = defaultdict(int)                 # (cache, result) -> count
+_rerun_totals = defaultdict(lambda: [0, 0.0])   # page -> [count, seconds]
+_recent_reruns = deque(maxlen=50)
+
+
+class Rerun:
+    """Spans and cache counters collected during one script run"""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self.duration = None
+        self.spans = []          # dicts with name, depth, offset_ms, ms
+        self.cache = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        self.depth = 0
+
+    def as_dict(self):
+        return {
+            'page': self.page,
+            'started_at': self.started_at,
+            'total_ms': round((self.duration or 0) * 1000, 3),
+            'spans': self.spans,
+            'cache': {name: dict(counts) for name, counts in self.cache.items()},
+        }
+
+
+def current_rerun():
+    """The rerun being recorded on this thread, or None"""
+    return getattr(_local, 'rerun', None)
+
+
+def begin_rerun(page):
+    """Start recording a new rerun of ``page`` (discarding any unfinished one)"""
+    _local.rerun = Rerun(page)
+    return _local.rerun
+
+
+class Span:
+    """An open span; call ``end()`` when the timed work is done"""
+
+    def __init__(self, rerun, name):
+        self.rerun = rerun
+        self.name = name
+        self.entry = None
+        if rerun is not None:
+            self.entry = {'name': name, 'depth': rerun.depth,
+                          'offset_ms': round((time.perf_counter() - rerun.started) * 1000, 3), 'ms': None}
+            rerun.spans.append(self.entry)
+            rerun.depth += 1
+        self.started = time.perf_counter()
+
+    def end(self):
+        if self.entry is None or self.entry['ms'] is not None:
+            return
+        elapsed = time.perf_counter() - self.started
+        self.rerun.depth -= 1
+        self.entry['ms'] = round(elapsed * 1000, 3)
+        with _totals_lock:
+            totals = _span_totals[(self.rerun.page, self.name)]
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+def start_span(name):
+    """Open a named span of the current rerun (for long, unindented page sections)"""
+    return Span(current_rerun(), name)
+
+
+@contextmanager
+def span(name):
+    """Time a block of work as a named span of the current rerun"""
+    opened = start_span(name)
+    try:
+        yield
+    finally:
+        opened.end()
+
+
+def record_cache(cache, hit, count=1):
+    """Count cache hits or misses for ``cache`` (works outside a rerun too)"""
+    result = 'hit' if hit else 'miss'
+    with _totals_lock:
+        _cache_totals[(cache, result)] += count
+    rerun = current_rerun()
+    if rerun is not None:
+        rerun.cache[cache][result] += count
+
+
+def end_rerun():
+    """Close the current rerun, export it and return it (None if none was started)"""
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun.duration = time.perf_counter() - rerun.started
+    with _totals_lock:
+        totals = _rerun_totals[rerun.page]
+        totals[0] += 1
+        totals[1] += rerun.duration
+        _recent_reruns.append(rerun)
+    if EXPORT_ENABLED:
+        try:
+            export(rerun)
+        except OSError:
+            pass  # metrics must never break a page
+    return rerun
+
+
+def recent_reruns(page=None):
+    """Recently finished reruns in this process, newest last"""
+    with _totals_lock:
+        return [r for r in _recent_reruns if page is None or r.page == page]
+
+
+# -------------------- Export --------------------
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def prometheus_text():
+    """Process-wide aggregates in the Prometheus text exposition format"""
+    lines = [
+        '# HELP algotrade_span_seconds Time spent in named spans of page reruns.',
+        '# TYPE algotrade_span_seconds summary',
+    ]
+    with _totals_lock:
+        for (page, name), (count, seconds) in sorted(_span_totals.items()):
+            labels = f'page="{_label(page)}",span="{_label(name)}"'
+            lines.append(f'algotrade_span_seconds_sum{{{labels}}} {seconds:.6f}')
+            lines.append(f'algotrade_span_seconds_count{{{labels}}} {count}')
+        lines += [
+            '# HELP algotrade_rerun_seconds Wall time of whole page reruns.',
+            '# TYPE algotrade_rerun_seconds summary',
+        ]
+        for page, (count, seconds) in sorted(_rerun_totals.items()):
+            lines.append(f'algotrade_rerun_seconds_sum{{page="{_label(page)}"}} {seconds:.6f}')
+            lines.append(f'algotrade_rerun_seconds_count{{page="{_label(page)}"}} {count}')
+        lines += [
+            '# HELP algotrade_cache_requests_total Cache lookups by result.',
+            '# TYPE algotrade_cache_requests_total counter',
+        ]
+        for (cache, result), count in sorted(_cache_totals.items()):
+            lines.append(f'algotrade_cache_requests_total{{cache="{_label(cache)}",result="{result}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def export(rerun, directory=None):
+    """Append the rerun to the span log and rewrite the Prometheus text file"""
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    log_path = os.path.join(directory, 'spans.log')
+    if os.path.exists(log_path) and os.path.getsize(log_path) > SPAN_LOG_MAX_BYTES:
+        os.replace(log_path, log_path + '.1')
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({'pid': os.getpid(), **rerun.as_dict()}) + '\n')
+
+    # One file per process so several Streamlit workers don't overwrite each other
+    prom_path = os.path.join(directory, f'algotrade_{os.getpid()}.prom')
+    tmp_path = prom_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, prom_path)
+
+
+# -------------------- Streamlit debug panel --------------------
+def debug_enabled():
+    """True when the sidebar timing panel was requested"""
+    if os.environ.get('ALGOTRADE_DEBUG', '').lower() in ('1', 'on', 'true'):
+        return True
+    try:
+        import streamlit as st
+        return st.query_params.get('debug') in ('1', 'true', 'on')
+    except Exception:
+        return False
+
+
+def render_debug_panel(rerun):
+    """Show a per-span breakdown of one rerun in the sidebar"""
+    import pandas as pd
+    import streamlit as st
+
+    total_ms = rerun.duration * 1000
+    with st.sidebar.expander(f"⏱️ Rerun timing: {total_ms:,.0f} ms", expanded=True):
+        if rerun.spans:
+            table = pd.DataFrame([{
+                'Span': '  ' * s['depth'] + s['name'],
+                'ms': s['ms'] if s['ms'] is not None else float('nan'),
+                '% of rerun': (s['ms'] or 0) / total_ms * 100 if total_ms else 0,
+            } for s in rerun.spans])
+            st.dataframe(table.style.format({'ms': '{:,.1f}', '% of rerun': '{:.0f}%'}),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.caption("No spans recorded in this rerun.")
+        for cache, counts in rerun.cache.items():
+            st.caption(f"Cache `{cache}`: {counts['hit']} hit(s), {counts['miss']} miss(es)")
+        previous = recent_reruns(rerun.page)[-6:-1]
+        if previous:
+            st.caption("Previous reruns: " + ", ".join(f"{r.duration * 1000:,.0f} ms" for r in previous))
+
+
+def finish_rerun():
+    """End the current rerun, export it and show the debug panel if requested"""
+    rerun = end_rerun()
+    if rerun is not None and debug_enabled():
+        render_debug_panel(rerun)
+    return rerun
@@ -0,0 +1,151 @@
+"""Intraday bars (1m to 1h) served from the finest interval already stored.
+
+A request for, say, 1h bars is answered by resampling cached 1m, 5m, 15m or
+30m bars when they cover the range, instead of downloading 1h bars separately.
+Resampling runs on the int64 timestamps and float32 price columns with
+``reduceat``, a bounded chunk of buckets at a time, so temporaries stay small
+even for months of 1m bars. Buckets are anchored at each day's first bar, so
+hourly bars of US stocks start at 9:30 like Yahoo's.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from algotrade.backtest import TRADING_DAYS
+from algotrade.price_store import COLUMNS, DAILY, _to_date, bars_frame, get_price_store, load_history
+from algotrade.providers import get_provider
+
+# Bar width in seconds, finest first
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '1d': 86400}
+
+# How far back Yahoo Finance serves each interval
+LOOKBACK_DAYS = {'1m': 7, '5m': 59, '15m': 59, '30m': 59, '1h': 729}
+
+RESAMPLE_CHUNK_ROWS = 1_000_000
+_NS = 1_000_000_000
+_DAY_NS = 86400 * _NS
+
+
+def bars_per_year(interval, around_the_clock=False):
+    """Number of bars in a year, for annualizing volatility of intraday returns"""
+    if interval == DAILY:
+        return 365 if around_the_clock else TRADING_DAYS
+    seconds = INTERVALS[interval]
+    if around_the_clock:
+        return 365 * 86400 // seconds
+    # A regular US session is 6.5 hours; a partial last bar still counts as a bar
+    return TRADING_DAYS * -(-int(6.5 * 3600) // seconds)
+
+
+def earliest_start(interval, today=None):
+    """First date the provider can still serve bars of ``interval`` for"""
+    today = today or date.today()
+    if interval == DAILY:
+        return None
+    return today - timedelta(days=LOOKBACK_DAYS[interval])
+
+
+def wall_clock(stamps, tz):
+    """Local wall-clock nanoseconds for UTC epoch nanoseconds (DST-aware)"""
+    stamps = np.asarray(stamps, dtype=np.int64)
+    if not tz or len(stamps) == 0:
+        return stamps
+    local = pd.DatetimeIndex(pd.to_datetime(stamps, utc=True)).tz_convert(tz).tz_localize(None)
+    return local.values.astype('datetime64[ns]').astype(np.int64)
+
+
+def bucket_starts(stamps, width_ns, wall=None):
+    """Row numbers where a new bucket begins, plus each bucket's UTC start time.
+
+    ``stamps`` are sorted epoch nanoseconds; ``wall`` holds the same moments in
+    local wall-clock time so days split at local midnight.
+    """
+    wall = stamps if wall is None else wall
+    day = wall // _DAY_NS
+    day_rows = np.flatnonzero(np.diff(day)) + 1
+    day_first = np.repeat(wall[np.concatenate([[0], day_rows])],
+                          np.diff(np.concatenate([[0], day_rows, [len(stamps)]])))
+    bucket = (wall - day_first) // width_ns
+    rows = np.flatnonzero((np.diff(day) != 0) | (np.diff(bucket) != 0)) + 1
+    rows = np.concatenate([[0], rows])
+    utc_offset = wall[rows] - stamps[rows]
+    return rows, day_first[rows] + bucket[rows] * width_ns - utc_offset
+
+
+def resample_arrays(stamps, columns, width_ns, tz=None, chunk_rows=RESAMPLE_CHUNK_ROWS):
+    """Aggregate OHLCV arrays into wider bars with reduceat, chunk by chunk"""
+    stamps = np.asarray(stamps, dtype=np.int64)
+    if len(stamps) == 0:
+        return stamps, {col: np.asarray(columns[col])[:0] for col in COLUMNS}
+    rows, starts = bucket_starts(stamps, width_ns, wall_clock(stamps, tz))
+    ends = np.append(rows[1:], len(stamps))
+
+    out = {col: [] for col in COLUMNS}
+    first = 0
+    while first < len(rows):
+        # Whole buckets only, about chunk_rows source rows at a time
+        last = max(int(np.searchsorted(rows, rows[first] + chunk_rows, side='right')), first + 1)
+        lo, hi = rows[first], ends[last - 1]
+        offsets = rows[first:last] - lo
+        chunk = {col: np.asarray(columns[col][lo:hi]) for col in COLUMNS}
+        out['Open'].append(chunk['Open'][offsets])
+        out['High'].append(np.maximum.reduceat(chunk['High'], offsets))
+        out['Low'].append(np.minimum.reduceat(chunk['Low'], offsets))
+        out['Close'].append(chunk['Close'][ends[first:last] - lo - 1])
+        out['Volume'].append(np.add.reduceat(chunk['Volume'], offsets))
+        first = last
+    return starts, {col: np.concatenate(parts) for col, parts in out.items()}
+
+
+def resample_ohlcv(frame, interval):
+    """Resample a date-indexed OHLCV frame to a wider intraday interval"""
+    if frame is None or frame.empty:
+        return frame
+    tz = str(frame.index.tz) if frame.index.tz is not None else None
+    index = frame.index.tz_convert('UTC').tz_localize(None) if tz else frame.index
+    stamps = index.values.astype('datetime64[ns]').astype(np.int64)
+    columns = {col: frame[col].to_numpy() for col in COLUMNS}
+    starts, bars = resample_arrays(stamps, columns, INTERVALS[interval] * _NS, tz)
+    return bars_frame(starts, bars, tz)
+
+
+def _covers(meta, start, end):
+    return (meta is not None and _to_date(meta['covered_start']) <= start
+            and _to_date(meta['covered_end']) >= end)
+
+
+def load_bars(symbol, start, end, interval=DAILY, provider=None):
+    """Bars of any interval for [start, end), built from the finest cached interval.
+
+    Daily bars come from the full-history store. Intraday requests are clipped
+    to what the provider can still serve; if a finer interval that divides the
+    requested one already covers the range it is resampled, otherwise the
+    requested interval is downloaded (only the missing part) and stored.
+    Today's forming bars are reused for one bar interval before they are
+    topped up again.
+    """
+    if interval == DAILY:
+        return load_history(symbol, start, end, provider)
+    provider = provider or get_provider()
+    store = get_price_store(provider)
+    start, end = _to_date(start), _to_date(end)
+    start = max(start, earliest_start(interval))
+    # Today's bars are still forming and are never marked as covered
+    covered_until = min(end, date.today())
+
+    def fetcher(bar_interval):
+        def fetch(fetch_start, fetch_end):
+            return provider.history(symbol, start=fetch_start, end=fetch_end, interval=bar_interval)
+        return fetch
+
+    width = INTERVALS[interval]
+    for finer, seconds in INTERVALS.items():
+        if seconds >= width or width % seconds:
+            continue
+        if _covers(store.read_meta(symbol, finer), start, covered_until):
+            # Only today's still-forming bars (if asked for) are fetched, at the finer interval
+            frame = store.get_history(symbol, start, end, fetcher(finer), interval=finer, tail_ttl=width)
+            return resample_ohlcv(frame, interval)
+
+    return store.get_history(symbol, start, end, fetcher(interval), interval=interval, tail_ttl=width)
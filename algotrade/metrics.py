@@ -0,0 +1,145 @@
+"""Risk and return statistics computed from one returns array.
+
+``risk_metrics`` turns a price series into daily returns once and derives every
+statistic (CAGR, volatility, Sharpe, Sortino, Calmar, VaR/CVaR, beta and the
+rolling series) from that same array with vectorized NumPy operations. Given a
+``RunningStats`` that already covers the prices, the volatility, Sharpe,
+Sortino and drawdown come from its running sums instead.
+"""
+import numpy as np
+import pandas as pd
+
+from algotrade.backtest import TRADING_DAYS, align_closes
+from algotrade.drawdown import underwater_curve
+
+
+def simple_returns(prices):
+    """Period-over-period returns of a price array (one shorter than the input)"""
+    prices = np.asarray(prices, dtype=float)
+    return prices[1:] / prices[:-1] - 1
+
+
+def cagr(prices, years):
+    """Compound annual growth rate in percent between the first and last price"""
+    prices = np.asarray(prices, dtype=float)
+    if len(prices) < 2 or years <= 0 or prices[0] <= 0:
+        return None
+    return float(((prices[-1] / prices[0]) ** (1 / years) - 1) * 100)
+
+
+def _window_sums(values, window):
+    """Sum of every trailing window of ``values`` using one cumulative sum"""
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    return cumulative[window:] - cumulative[:-window]
+
+
+def rolling_volatility(returns, window=21, periods_per_year=TRADING_DAYS):
+    """Annualized rolling volatility in percent (NaN until the window fills)"""
+    returns = np.asarray(returns, dtype=float)
+    out = np.full(len(returns), np.nan)
+    if len(returns) < window or window < 2:
+        return out
+    s1 = _window_sums(returns, window)
+    s2 = _window_sums(returns ** 2, window)
+    variance = np.clip((s2 - s1 ** 2 / window) / (window - 1), 0, None)
+    out[window - 1:] = np.sqrt(variance * periods_per_year) * 100
+    return out
+
+
+def rolling_correlation(a, b, window=63):
+    """Rolling Pearson correlation of two equally long return arrays"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    out = np.full(len(a), np.nan)
+    if len(a) < window or window < 2:
+        return out
+    sa, sb = _window_sums(a, window), _window_sums(b, window)
+    saa, sbb, sab = _window_sums(a * a, window), _window_sums(b * b, window), _window_sums(a * b, window)
+    cov = sab - sa * sb / window
+    var_a = saa - sa ** 2 / window
+    var_b = sbb - sb ** 2 / window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[window - 1:] = cov / np.sqrt(var_a * var_b)
+    return out
+
+
+def _benchmark_returns(close, benchmark):
+    """Dates, asset and benchmark returns on the days both actually traded"""
+    dates, _, prices, observed = align_closes({'asset': close, 'benchmark': benchmark})
+    both = observed.all(axis=1)
+    prices = prices[both]
+    return dates[both][1:], simple_returns(prices[:, 0]), simple_returns(prices[:, 1])
+
+
+def risk_metrics(close, benchmark=None, periods_per_year=TRADING_DAYS, risk_free_rate=0.0,
+                 confidence=0.95, volatility_window=21, correlation_window=63, stats=None):
+    """Full set of risk/return statistics for a date-indexed Close series.
+
+    ``benchmark`` is an optional Close series (e.g. SPY) for beta and rolling
+    correlation. ``stats`` is an optional ``RunningStats`` of the same prices.
+    Rates and volatilities are returned in percent.
+    """
+    prices = np.asarray(close, dtype=float)
+    returns = simple_returns(prices)
+    n = len(returns)
+    per_period_rf = (1 + risk_free_rate / 100) ** (1 / periods_per_year) - 1
+    excess = returns - per_period_rf
+
+    if isinstance(close, pd.Series) and isinstance(close.index, pd.DatetimeIndex) and n:
+        years = (close.index[-1] - close.index[0]).days / 365.25
+    else:
+        years = n / periods_per_year
+
+    if stats is not None:
+        std = np.sqrt(stats.variance) if n > 1 else np.nan
+        mean_excess = stats.mean - per_period_rf
+        # The running downside sum assumes a zero risk-free rate
+        downside = (np.sqrt(stats.downside_sq / n) if not per_period_rf else
+                    np.sqrt(np.mean(np.minimum(excess, 0) ** 2))) if n else np.nan
+        max_drawdown = stats.max_drawdown * 100
+    else:
+        std = returns.std(ddof=1) if n > 1 else np.nan
+        mean_excess = excess.mean() if n else np.nan
+        downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2)) if n else np.nan
+        max_drawdown = float(underwater_curve(prices).min() * 100) if len(prices) else 0.0
+    growth = cagr(prices, years)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = mean_excess / std * np.sqrt(periods_per_year) if n > 1 else np.nan
+        sortino = mean_excess / downside * np.sqrt(periods_per_year) if n else np.nan
+        calmar = growth / abs(max_drawdown) if growth is not None and max_drawdown < 0 else np.nan
+
+    # Historical VaR/CVaR: the loss not exceeded on `confidence` of days, and the average beyond it
+    if n:
+        cutoff = np.quantile(returns, 1 - confidence)
+        var = -cutoff * 100
+        cvar = -returns[returns <= cutoff].mean() * 100
+    else:
+        var = cvar = np.nan
+
+    metrics = {
+        'cagr': growth,
+        'volatility': float(std * np.sqrt(periods_per_year) * 100) if n > 1 else 0.0,
+        'sharpe': float(sharpe),
+        'sortino': float(sortino),
+        'calmar': float(calmar),
+        'max_drawdown': max_drawdown,
+        'var': float(var),
+        'cvar': float(cvar),
+        'beta': np.nan,
+        'correlation': np.nan,
+        'returns': returns,
+        'rolling_volatility': rolling_volatility(returns, volatility_window, periods_per_year),
+        'rolling_correlation': None,
+        'correlation_dates': None,
+    }
+
+    if benchmark is not None and len(benchmark) > 2 and n > 2:
+        dates, asset_r, bench_r = _benchmark_returns(close, benchmark)
+        if len(asset_r) > 2:
+            cov = np.cov(asset_r, bench_r, ddof=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                metrics['beta'] = float(cov[0, 1] / cov[1, 1])
+                metrics['correlation'] = float(cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1]))
+            metrics['rolling_correlation'] = rolling_correlation(asset_r, bench_r, correlation_window)
+            metrics['correlation_dates'] = dates
+    return metrics
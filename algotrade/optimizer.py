@@ -0,0 +1,207 @@
+"""Parameter sweeps for the SMA crossover strategy across many tickers.
+
+The aligned price matrix (and its ``observed`` mask) is copied once into
+``multiprocessing`` shared memory. Worker processes attach to it by name, so
+tasks only carry a column number and a few window lengths instead of a pickled
+copy of the prices. Each column is backtested on its own real bars only, so a
+stock in a sweep that also holds crypto keeps its trading-day calendar.
+All sweeps share one process pool with a capped number of workers, started
+with ``forkserver`` so no worker is forked from the threaded Streamlit server.
+Each task evaluates one fast window against every slow window of one ticker at
+once: the positions of all slow windows form one (bars x windows) matrix and
+returns, drawdowns and trade counts come from column-wise NumPy operations.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from algotrade.backtest import TRADING_DAYS
+
+# Shared by every session of the process, so concurrent sweeps queue instead of multiplying workers
+MAX_WORKERS = int(os.environ.get('ALGOTRADE_SWEEP_WORKERS', min(4, os.cpu_count() or 1)))
+
+_pool = None
+_pool_futures = set()           # submitted and not finished, cancelled if the pool breaks
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """The process-wide sweep pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['algotrade.optimizer'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _pool
+
+
+def _submit(fn, *args):
+    """Submit to the shared pool, remembering the future until it finishes"""
+    future = _get_pool().submit(fn, *args)
+    with _pool_lock:
+        _pool_futures.add(future)
+    future.add_done_callback(_pool_futures.discard)
+    return future
+
+
+def _reset_pool():
+    """Drop a pool whose workers died so the next sweep starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            # shutdown(cancel_futures=True) needs Python 3.9, so cancel the queue by hand
+            for future in list(_pool_futures):
+                future.cancel()
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def _share(array):
+    """Copy ``array`` into a new shared memory block; returns (block, (name, shape, dtype))"""
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[:] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def _read_column(name, shape, dtype, column):
+    """Copy one column out of a shared matrix"""
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        matrix = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        values = matrix[:, column].copy()
+        del matrix
+    finally:
+        memory.close()
+    return values
+
+
+def moving_averages(close, windows):
+    """{window: SMA array} for many windows from a single cumulative sum"""
+    cumulative = np.concatenate([[0.0], np.cumsum(close)])
+    averages = {}
+    for window in windows:
+        out = np.full(len(close), np.nan)
+        out[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+        averages[window] = out
+    return averages
+
+
+def crossover_grid(close, fast, slow_windows, averages, cost_bps=0.0, periods_per_year=TRADING_DAYS):
+    """Stats of the SMA(fast)/SMA(slow) crossover for every slow window at once.
+
+    Matches ``strategies.sma_crossover``: flat until the first upward cross,
+    then long exactly while the fast average is above the slow one.
+    """
+    fast_line = averages[fast][:, None]
+    slow_lines = np.column_stack([averages[w] for w in slow_windows])
+    valid = ~np.isnan(fast_line) & ~np.isnan(slow_lines)
+    above = (fast_line > slow_lines) & valid
+    crosses = np.zeros_like(above)
+    crosses[1:] = above[1:] & ~above[:-1] & valid[:-1]
+    position = (above & (np.cumsum(crosses, axis=0) > 0)).astype(float)
+
+    changes = np.diff(np.vstack([np.zeros((1, position.shape[1])), position]), axis=0)
+    returns = close[1:] / close[:-1] - 1
+    strategy = position[:-1] * returns[:, None] - np.abs(changes[:-1]) * cost_bps / 10000
+    growth = np.vstack([np.ones((1, position.shape[1])), np.cumprod(1 + strategy, axis=0)])
+    drawdown = (growth / np.maximum.accumulate(growth, axis=0) - 1).min(axis=0)
+
+    std = strategy.std(axis=0, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, strategy.mean(axis=0) / std * np.sqrt(periods_per_year), np.nan)
+    return {
+        'return_percentage': (growth[-1] - 1) * 100,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown * 100,
+        'trades': (changes > 0).sum(axis=0),
+    }
+
+
+def _sweep_task(shared, shared_observed, column, fast_windows, windows, cost_bps, periods_per_year):
+    """Worker: every (fast, slow) pair of one ticker for a slice of fast windows"""
+    close = _read_column(*shared, column)
+    if shared_observed is not None:
+        # Only the asset's own bars: forward-filled rows would stretch its SMA windows
+        close = close[_read_column(*shared_observed, column)]
+    close = close[np.argmax(~np.isnan(close)):]
+    rows = []
+    if len(close) < 3:
+        return column, rows
+    averages = moving_averages(close, [w for w in windows if w <= len(close)])
+    for fast in fast_windows:
+        slow_windows = [w for w in windows if w > fast and w in averages]
+        if fast not in averages or not slow_windows:
+            continue
+        stats = crossover_grid(close, fast, slow_windows, averages, cost_bps, periods_per_year)
+        rows.append((fast, np.array(slow_windows), stats))
+    return column, rows
+
+
+def sma_sweep(prices, symbols, observed=None, windows=range(5, 201, 5), cost_bps=0.0,
+              periods_per_year=TRADING_DAYS):
+    """Backtest every fast < slow SMA pair from ``windows`` on every column.
+
+    ``prices`` and ``observed`` are the (dates x symbols) matrices returned by
+    ``align_closes``; with ``observed`` each column only uses its real bars.
+    ``periods_per_year`` is one number or one per column (e.g. 365 for crypto).
+    Returns a DataFrame with one row per (symbol, fast, slow), best Sharpe first.
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    periods = np.broadcast_to(np.asarray(periods_per_year, dtype=float), (len(symbols),))
+    windows = sorted(set(int(w) for w in windows if w >= 2))
+    # Several tasks per ticker so the pool stays busy with few, long price series
+    fast_chunks = np.array_split(np.array(windows[:-1]), max(1, min(len(windows) - 1, MAX_WORKERS)))
+    tasks = [(column, chunk.tolist()) for column in range(len(symbols)) for chunk in fast_chunks if len(chunk)]
+
+    blocks = []
+    try:
+        memory, shared = _share(prices)
+        blocks.append(memory)
+        shared_observed = None
+        if observed is not None:
+            memory, shared_observed = _share(np.ascontiguousarray(observed, dtype=bool))
+            blocks.append(memory)
+        try:
+            futures = [_submit(_sweep_task, shared, shared_observed, column, chunk, windows, cost_bps,
+                               float(periods[column]))
+                       for column, chunk in tasks]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _reset_pool()
+            raise
+    finally:
+        for memory in blocks:
+            memory.close()
+            memory.unlink()
+
+    frames = []
+    for column, rows in results:
+        for fast, slow_windows, stats in rows:
+            frames.append(pd.DataFrame({
+                'Symbol': symbols[column],
+                'Fast': fast,
+                'Slow': slow_windows,
+                'Return %': stats['return_percentage'],
+                'Sharpe': stats['sharpe'],
+                'Max Drawdown %': stats['max_drawdown'],
+                'Trades': stats['trades'],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=['Symbol', 'Fast', 'Slow', 'Return %', 'Sharpe', 'Max Drawdown %', 'Trades'])
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values('Sharpe', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def sweep_heatmap(table, value='Sharpe'):
+    """Median of ``value`` across symbols as a (slow x fast) grid for a heatmap"""
+    return table.pivot_table(index='Slow', columns='Fast', values=value, aggfunc='median')
@@ -0,0 +1,250 @@
+"""Limit, stop and stop-limit orders matched against OHLC bars.
+
+Each symbol has an order book of four price-indexed heaps: buy limits (highest
+price first), sell limits (lowest first), buy stops (lowest trigger first) and
+sell stops (highest trigger first). A bar only ever looks at the top of each
+heap, so checking thousands of resting orders against one bar costs
+O(k log n) for the k orders that actually trigger instead of a scan of all n.
+Cancelled orders stay in their heap and are skipped when they reach the top.
+
+Fill prices follow the usual bar-simulation rules: a limit order fills at its
+limit, or at the open if the bar gaps through it; a stop becomes a market order
+and fills at its stop price, or at the open on a gap. A stop-limit becomes a
+limit order once its stop is hit; on that bar it fills at its stop price (or
+the open on a gap) capped by its limit, and after that like any limit order.
+
+Only closed bars are matched, and an order only sees bars that start after it
+was placed: orders placed after the last processed bar wait in a pending heap
+until then, so placing an order never makes the others skip a bar.
+"""
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+ORDER_TYPES = ('limit', 'stop', 'stop_limit')
+
+
+class Order:
+    """A resting order; ``shares`` is positive, the direction is ``side``"""
+
+    def __init__(self, order_id, symbol, side, shares, order_type, limit_price=None, stop_price=None,
+                 placed=None):
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Unknown side {side!r}")
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type {order_type!r}")
+        if order_type in ('limit', 'stop_limit') and limit_price is None:
+            raise ValueError(f"A {order_type} order needs a limit price")
+        if order_type in ('stop', 'stop_limit') and stop_price is None:
+            raise ValueError(f"A {order_type} order needs a stop price")
+        self.id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.shares = int(shares)
+        self.order_type = order_type
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.placed = placed
+        self.status = 'open'        # open -> triggered (stop-limit) -> filled / cancelled / rejected
+        self.fill_price = None
+        self.fill_time = None
+
+    @property
+    def active(self):
+        return self.status in ('open', 'triggered')
+
+    def describe(self):
+        """Short text such as 'Buy 5 AAPL limit $180.00'"""
+        text = f"{self.side.title()} {self.shares} {self.symbol}"
+        if self.stop_price is not None:
+            text += f" stop ${self.stop_price:.2f}"
+        if self.limit_price is not None:
+            text += f" limit ${self.limit_price:.2f}"
+        return text
+
+
+class OrderBook:
+    """Open orders of one symbol, indexed by the price that makes them act"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.last_time = None       # time of the last bar processed
+        self._active = 0            # open and triggered orders, pending ones included
+        self._sequence = itertools.count()  # time priority between equal prices
+        self._buy_limits = []       # (-limit, seq, order)
+        self._sell_limits = []      # (limit, seq, order)
+        self._buy_stops = []        # (stop, seq, order)
+        self._sell_stops = []       # (-stop, seq, order)
+        self._pending = []          # (placed, seq, order) for orders newer than last_time
+
+    def add(self, order):
+        """Add an order; orders must arrive in the order they were placed"""
+        self._active += 1
+        if self.last_time is None:
+            self.last_time = order.placed
+        if order.placed is not None and self.last_time is not None and order.placed > self.last_time:
+            heapq.heappush(self._pending, (order.placed, next(self._sequence), order))
+        else:
+            self._queue(order)
+
+    def _queue(self, order):
+        if order.order_type == 'limit' or order.status == 'triggered':
+            self._add_limit(order)
+        elif order.side == 'buy':
+            heapq.heappush(self._buy_stops, (order.stop_price, next(self._sequence), order))
+        else:
+            heapq.heappush(self._sell_stops, (-order.stop_price, next(self._sequence), order))
+
+    def cancel(self, order):
+        # The order is dropped lazily once it reaches the top of its heap
+        if order.active:
+            order.status = 'cancelled'
+            self._active -= 1
+
+    def _add_limit(self, order):
+        if order.side == 'buy':
+            heapq.heappush(self._buy_limits, (-order.limit_price, next(self._sequence), order))
+        else:
+            heapq.heappush(self._sell_limits, (order.limit_price, next(self._sequence), order))
+
+    @staticmethod
+    def _pop_while(heap, reached):
+        """Pop and return the active orders at the top of ``heap`` whose key satisfies ``reached``"""
+        hits = []
+        while heap and (not heap[0][2].active or reached(heap[0][0])):
+            _, _, order = heapq.heappop(heap)
+            if order.active:
+                hits.append(order)
+        return hits
+
+    def process_bar(self, open_, high, low, time=None, accept=None):
+        """Match one bar against the book and return the orders it filled.
+
+        ``time`` is the bar's start; orders placed before it join the book
+        first. ``accept(order, price)`` may refuse a fill (e.g. not enough
+        cash); the order is then marked rejected.
+        """
+        filled = []
+        while self._pending and (time is None or self._pending[0][0] < time):
+            order = heapq.heappop(self._pending)[2]
+            if order.active:
+                self._queue(order)
+
+        def fill(order, price):
+            self._active -= 1
+            order.fill_price, order.fill_time = price, time
+            if accept is None or accept(order, price):
+                order.status = 'filled'
+                filled.append(order)
+            else:
+                order.status, order.fill_price, order.fill_time = 'rejected', None, None
+
+        # Stops first: a triggered stop is a market order, a stop-limit joins the limit heaps
+        start = {}                  # stop-limits triggered by this bar -> price they became live at
+        for order in self._pop_while(self._buy_stops, lambda stop: stop <= high):
+            if order.order_type == 'stop':
+                fill(order, max(open_, order.stop_price))
+            else:
+                order.status = 'triggered'
+                start[order] = max(open_, order.stop_price)
+                self._add_limit(order)
+        for order in self._pop_while(self._sell_stops, lambda stop: -stop >= low):
+            if order.order_type == 'stop':
+                fill(order, min(open_, order.stop_price))
+            else:
+                order.status = 'triggered'
+                start[order] = min(open_, order.stop_price)
+                self._add_limit(order)
+
+        for order in self._pop_while(self._buy_limits, lambda limit: -limit >= low):
+            fill(order, min(start.get(order, open_), order.limit_price))
+        for order in self._pop_while(self._sell_limits, lambda limit: limit <= high):
+            fill(order, max(start.get(order, open_), order.limit_price))
+
+        if time is not None:
+            self.last_time = time
+        return filled
+
+    def process_bars(self, bars, accept=None, until=None):
+        """Match every bar of an OHLC frame newer than the last one processed, in time order.
+
+        With ``until``, bars starting after it are still forming and are left
+        for a later call.
+        """
+        if bars is None or bars.empty:
+            return []
+        index = bars.index
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        keep = np.ones(len(index), dtype=bool)
+        if self.last_time is not None:
+            keep &= index > self.last_time
+        if until is not None:
+            keep &= index <= until
+        bars, index = bars[keep], index[keep]
+        filled = []
+        for time, open_, high, low in zip(index, bars['Open'].to_numpy(),
+                                          bars['High'].to_numpy(), bars['Low'].to_numpy()):
+            if not self._active:
+                # Nothing left to match: skip straight past the remaining bars
+                self.last_time = index[-1]
+                break
+            filled += self.process_bar(float(open_), float(high), float(low), time, accept)
+        return filled
+
+    def open_orders(self):
+        """Active orders, oldest first"""
+        entries = self._buy_limits + self._sell_limits + self._buy_stops + self._sell_stops + self._pending
+        return sorted((order for _, _, order in entries if order.active), key=lambda order: order.id)
+
+    def __bool__(self):
+        return self._active > 0
+
+
+class OrderEngine:
+    """Order books of every symbol plus an id lookup for cancelling"""
+
+    def __init__(self):
+        self.books = {}
+        self.orders = {}
+        self._next_id = 1
+
+    def place(self, symbol, side, shares, order_type, limit_price=None, stop_price=None, placed=None,
+              order_id=None, status='open'):
+        """Add a resting order; it only sees bars after ``placed`` (default now).
+
+        ``order_id`` and ``status`` restore an order kept elsewhere, e.g. in the
+        classroom database; new orders are numbered by the engine.
+        """
+        placed = pd.Timestamp.now(tz='UTC') if placed is None else pd.Timestamp(placed)
+        if placed.tz is None:
+            placed = placed.tz_localize('UTC')
+        if order_id is None:
+            order_id = self._next_id
+        self._next_id = max(self._next_id, order_id + 1)
+        order = Order(order_id, symbol.upper(), side, shares, order_type, limit_price, stop_price, placed)
+        order.status = status
+        self.books.setdefault(order.symbol, OrderBook(order.symbol)).add(order)
+        self.orders[order.id] = order
+        return order
+
+    def cancel(self, order_id):
+        order = self.orders.get(order_id)
+        if order is not None:
+            self.books[order.symbol].cancel(order)
+        return order
+
+    def process(self, symbol, bars, accept=None, until=None):
+        """Fills produced by a symbol's new closed bars"""
+        book = self.books.get(symbol.upper())
+        if not book:
+            return []
+        return book.process_bars(bars, accept, until)
+
+    def open_orders(self):
+        return [order for order in self.orders.values() if order.active]
+
+    def symbols_with_orders(self):
+        return [symbol for symbol, book in self.books.items() if book]
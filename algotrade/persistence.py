@@ -0,0 +1,239 @@
+"""Server-side storage of student portfolios in an embedded SQLite database.
+
+Portfolios, holdings, the trade ledger, resting orders and daily valuation
+snapshots live in one WAL-mode database file under ``DATA_DIR``, so they
+survive session expiry and every Streamlit worker sees the same data. Lookups
+by student and by symbol are indexed and bulk writes use ``executemany``
+inside one transaction.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from algotrade.config import DATA_DIR
+
+DB_PATH = os.environ.get('ALGOTRADE_DB_PATH', os.path.join(DATA_DIR, 'classroom.sqlite'))
+DEFAULT_CLASSROOM = 'default'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    classroom TEXT NOT NULL,
+    cash REAL NOT NULL,
+    starting_cash REAL NOT NULL,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    UNIQUE (classroom, student)
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios (id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    PRIMARY KEY (portfolio_id, symbol)
+);
+CREATE INDEX IF NOT EXISTS holdings_symbol ON holdings (symbol);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios (id) ON DELETE CASCADE,
+    time TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_portfolio_time ON trades (portfolio_id, time);
+CREATE INDEX IF NOT EXISTS trades_symbol ON trades (symbol);
+CREATE TABLE IF NOT EXISTS snapshots (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios (id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (portfolio_id, date)
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios (id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    order_type TEXT NOT NULL,
+    limit_price REAL,
+    stop_price REAL,
+    placed TEXT NOT NULL,
+    status TEXT NOT NULL,
+    fill_price REAL,
+    fill_time TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_portfolio_status ON orders (portfolio_id, status);
+"""
+
+
+class PortfolioDB:
+    """Portfolios, holdings, trades and snapshots of every student"""
+
+    def __init__(self, path=None):
+        self.path = path or DB_PATH
+        self._local = threading.local()
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    # -------------------- Portfolios --------------------
+    def portfolio_id(self, student, classroom=DEFAULT_CLASSROOM, starting_cash=1000.0):
+        """Id of a student's portfolio, creating an empty one on first use"""
+        with self._transaction() as conn:
+            return self._portfolio_id(conn, student, classroom, starting_cash)
+
+    @staticmethod
+    def _portfolio_id(conn, student, classroom, starting_cash):
+        # Runs inside the caller's transaction so creating and using the row is one write
+        now = datetime.now().isoformat(timespec='seconds')
+        conn.execute('INSERT OR IGNORE INTO portfolios (student, classroom, cash, starting_cash, created, updated) '
+                     'VALUES (?, ?, ?, ?, ?, ?)', (student, classroom, starting_cash, starting_cash, now, now))
+        return conn.execute('SELECT id FROM portfolios WHERE classroom = ? AND student = ?',
+                            (classroom, student)).fetchone()[0]
+
+    def load_portfolio(self, student, classroom=DEFAULT_CLASSROOM):
+        """Id, holdings, cash and trade ledger in the trader page's format, or None"""
+        conn = self._connect()
+        row = conn.execute('SELECT id, cash, starting_cash FROM portfolios WHERE classroom = ? AND student = ?',
+                           (classroom, student)).fetchone()
+        if row is None:
+            return None
+        portfolio_id, cash, starting_cash = row
+        holdings = conn.execute('SELECT symbol, shares FROM holdings WHERE portfolio_id = ? AND shares > 0',
+                                (portfolio_id,)).fetchall()
+        trades = conn.execute('SELECT time, symbol, shares, price FROM trades WHERE portfolio_id = ? ORDER BY time, id',
+                              (portfolio_id,)).fetchall()
+        return {
+            'id': portfolio_id,
+            'portfolio': {symbol: {'shares': shares, 'cash': 0.0} for symbol, shares in holdings},
+            'cash': cash,
+            'starting_cash': starting_cash,
+            'trades': [{'time': t, 'symbol': s, 'shares': n, 'price': p} for t, s, n, p in trades],
+        }
+
+    def save_portfolio(self, student, portfolio, cash, trades=(), starting_cash=None,
+                       classroom=DEFAULT_CLASSROOM):
+        """Replace a student's holdings and ledger in one batched transaction"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as conn:
+            portfolio_id = self._portfolio_id(conn, student, classroom,
+                                              starting_cash if starting_cash is not None else cash)
+            conn.execute('UPDATE portfolios SET cash = ?, starting_cash = COALESCE(?, starting_cash), updated = ? '
+                         'WHERE id = ?', (cash, starting_cash, now, portfolio_id))
+            conn.execute('DELETE FROM holdings WHERE portfolio_id = ?', (portfolio_id,))
+            conn.executemany('INSERT INTO holdings (portfolio_id, symbol, shares) VALUES (?, ?, ?)',
+                             [(portfolio_id, symbol, int(info['shares'])) for symbol, info in portfolio.items()])
+            conn.execute('DELETE FROM trades WHERE portfolio_id = ?', (portfolio_id,))
+            conn.executemany('INSERT INTO trades (portfolio_id, time, symbol, shares, price) VALUES (?, ?, ?, ?, ?)',
+                             [(portfolio_id, t['time'], t['symbol'], int(t['shares']), float(t['price']))
+                              for t in trades])
+        return portfolio_id
+
+    def record_trade(self, portfolio_id, trade, cash):
+        """Append one trade, adjust the holding and set the new cash balance atomically"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as conn:
+            conn.execute('INSERT INTO trades (portfolio_id, time, symbol, shares, price) VALUES (?, ?, ?, ?, ?)',
+                         (portfolio_id, trade['time'], trade['symbol'], int(trade['shares']), float(trade['price'])))
+            conn.execute('INSERT INTO holdings (portfolio_id, symbol, shares) VALUES (?, ?, ?) '
+                         'ON CONFLICT (portfolio_id, symbol) DO UPDATE SET shares = shares + excluded.shares',
+                         (portfolio_id, trade['symbol'], int(trade['shares'])))
+            conn.execute('DELETE FROM holdings WHERE portfolio_id = ? AND shares <= 0', (portfolio_id,))
+            conn.execute('UPDATE portfolios SET cash = ?, updated = ? WHERE id = ?', (cash, now, portfolio_id))
+
+    def missing_snapshots(self, date, classroom=DEFAULT_CLASSROOM):
+        """Ids of the classroom's portfolios with no snapshot for ``date`` (a read, no write lock)"""
+        rows = self._connect().execute(
+            'SELECT p.id FROM portfolios p WHERE p.classroom = ? AND NOT EXISTS '
+            '(SELECT 1 FROM snapshots s WHERE s.portfolio_id = p.id AND s.date = ?)', (classroom, date)).fetchall()
+        return {row[0] for row in rows}
+
+    def record_snapshots(self, snapshots):
+        """Upsert many (portfolio_id, date, value) valuation rows in one transaction"""
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO snapshots (portfolio_id, date, value) VALUES (?, ?, ?) '
+                             'ON CONFLICT (portfolio_id, date) DO UPDATE SET value = excluded.value',
+                             list(snapshots))
+
+    # -------------------- Orders --------------------
+    def add_order(self, portfolio_id, symbol, side, shares, order_type, limit_price, stop_price, placed,
+                  status='open'):
+        """Store a new resting order and return its id"""
+        with self._transaction() as conn:
+            return conn.execute('INSERT INTO orders (portfolio_id, symbol, side, shares, order_type, limit_price, '
+                                'stop_price, placed, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (portfolio_id, symbol, side, int(shares), order_type, limit_price, stop_price,
+                                 placed, status)).lastrowid
+
+    def update_orders(self, orders):
+        """Save the status and fill of many orders (anything with those attributes) in one transaction"""
+        with self._transaction() as conn:
+            conn.executemany('UPDATE orders SET status = ?, fill_price = ?, fill_time = ? WHERE id = ?',
+                             [(order.status, order.fill_price,
+                               order.fill_time.isoformat() if order.fill_time is not None else None, order.id)
+                              for order in orders])
+
+    def open_orders(self, portfolio_id):
+        """A student's open and triggered orders as ``OrderEngine.place`` keyword arguments, oldest first"""
+        rows = self._connect().execute(
+            'SELECT id, symbol, side, shares, order_type, limit_price, stop_price, placed, status FROM orders '
+            "WHERE portfolio_id = ? AND status IN ('open', 'triggered') ORDER BY placed, id",
+            (portfolio_id,)).fetchall()
+        names = ('order_id', 'symbol', 'side', 'shares', 'order_type', 'limit_price', 'stop_price', 'placed', 'status')
+        return [dict(zip(names, row)) for row in rows]
+
+    # -------------------- Classroom queries --------------------
+    def holders(self, symbol, classroom=None):
+        """(student, shares) of everyone holding ``symbol`` (uses the symbol index)"""
+        sql = ('SELECT p.student, h.shares FROM holdings h JOIN portfolios p ON p.id = h.portfolio_id '
+               'WHERE h.symbol = ?')
+        params = [symbol]
+        if classroom is not None:
+            sql += ' AND p.classroom = ?'
+            params.append(classroom)
+        return self._connect().execute(sql + ' ORDER BY h.shares DESC', params).fetchall()
+
+    def all_holdings(self, classroom=DEFAULT_CLASSROOM):
+        """Every portfolio's (id, student, cash, starting cash) and (portfolio id, symbol, shares) rows"""
+        conn = self._connect()
+        portfolios = conn.execute('SELECT id, student, cash, starting_cash FROM portfolios WHERE classroom = ? '
+                                  'ORDER BY id', (classroom,)).fetchall()
+        holdings = conn.execute('SELECT h.portfolio_id, h.symbol, h.shares FROM holdings h '
+                                'JOIN portfolios p ON p.id = h.portfolio_id WHERE p.classroom = ?',
+                                (classroom,)).fetchall()
+        return portfolios, holdings
+
+
+_db = None
+
+
+def get_portfolio_db():
+    """Return the process-wide handle on the classroom database"""
+    global _db
+    if _db is None:
+        _db = PortfolioDB()
+    return _db
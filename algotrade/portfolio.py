@@ -0,0 +1,86 @@
+"""Valuation helpers for the paper-trading portfolio."""
+import numpy as np
+import pandas as pd
+
+
+def portfolio_value(portfolio, cash, prices):
+    """Cash plus every holding at its latest price (holdings without a price count as 0)"""
+    total = cash
+    for symbol, info in portfolio.items():
+        price = prices.get(symbol)
+        if price:
+            total += price * info['shares']
+    return total
+
+
+def ledger_arrays(trades, dates, symbols):
+    """Per-row share changes (dates x symbols) and cash flows of a trade ledger.
+
+    Each trade is a dict with 'time', 'symbol', 'shares' (negative for a sale)
+    and 'price'. A trade counts from the first row on or after its date.
+    """
+    deltas = np.zeros((len(dates), len(symbols)))
+    cash_flow = np.zeros(len(dates))
+    if not trades or not len(dates):
+        return deltas, cash_flow
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    times = pd.DatetimeIndex([pd.Timestamp(t['time']) for t in trades]).normalize()
+    rows = np.minimum(dates.searchsorted(times), len(dates) - 1)
+    cols = np.array([column[t['symbol']] for t in trades])
+    shares = np.array([t['shares'] for t in trades], dtype=float)
+    prices = np.array([t['price'] for t in trades], dtype=float)
+    np.add.at(deltas, (rows, cols), shares)
+    np.add.at(cash_flow, rows, -shares * prices)
+    return deltas, cash_flow
+
+
+def equity_curve(trades, dates, symbols, closes, starting_cash):
+    """Daily portfolio value rebuilt from a trade ledger in one vectorized pass.
+
+    ``closes`` is a (dates x symbols) matrix of forward-filled closing prices.
+    Holdings are the running sum of the ledger's share changes, and the value
+    on each date is the row-wise product of holdings and closes plus cash.
+    Returns (holdings, cash, values).
+    """
+    deltas, cash_flow = ledger_arrays(trades, dates, symbols)
+    holdings = np.cumsum(deltas, axis=0)
+    cash = starting_cash + np.cumsum(cash_flow)
+    values = np.einsum('ij,ij->i', holdings, np.nan_to_num(closes)) + cash
+    return holdings, cash, values
+
+
+def holdings_matrix(portfolio_ids, holdings):
+    """Sparse (portfolios x symbols) share matrix in coordinate form.
+
+    ``holdings`` are (portfolio id, symbol, shares) rows. Returns the distinct
+    symbols (sorted) and, per non-zero entry, its row, column and share count.
+    """
+    portfolio_ids = np.asarray(portfolio_ids)
+    if not len(holdings):
+        return [], np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0)
+    ids, symbols, shares = zip(*holdings)
+    order = np.argsort(portfolio_ids, kind='stable')
+    rows = order[np.searchsorted(portfolio_ids, np.asarray(ids), sorter=order)]
+    symbols, columns = np.unique(np.asarray(symbols), return_inverse=True)
+    return symbols.tolist(), rows, columns, np.asarray(shares, dtype=float)
+
+
+def fully_priced(portfolio_ids, holdings, prices):
+    """Boolean per portfolio: does every symbol it holds have a price?"""
+    symbols, rows, columns, _ = holdings_matrix(portfolio_ids, holdings)
+    priced = np.array([bool(prices.get(symbol)) for symbol in symbols], dtype=bool)
+    complete = np.ones(len(portfolio_ids), dtype=bool)
+    complete[rows[~priced[columns]]] = False
+    return complete
+
+
+def value_portfolios(portfolio_ids, cash, holdings, prices):
+    """Value of many portfolios as one sparse holdings x price-vector product.
+
+    ``prices`` maps symbol -> latest price (missing prices count as 0, as in
+    ``portfolio_value``). Cost is linear in the number of holdings.
+    """
+    symbols, rows, columns, shares = holdings_matrix(portfolio_ids, holdings)
+    price_vector = np.array([prices.get(symbol) or 0.0 for symbol in symbols])
+    weights = shares * price_vector[columns] if len(shares) else shares
+    return np.asarray(cash, dtype=float) + np.bincount(rows, weights=weights, minlength=len(portfolio_ids))
@@ -0,0 +1,331 @@
+"""On-disk columnar OHLCV store with one partition per ticker.
+
+Every ticker gets its own directory holding one memory-mapped ``.npy`` file per
+column and a ``meta.json`` that records which date range has already been
+downloaded. Pages load a ticker's whole history once and answer every date
+range by binary-searching the sorted index, so switching between date presets
+never triggers a download; only the newest bars are topped up.
+
+Intraday bars (1m to 1h) live in a sub-directory per interval next to the daily
+files. They are stored as float32 prices and int64 epoch-nanosecond
+timestamps, since intraday histories are hundreds of times larger than daily
+ones.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from algotrade.config import DATA_DIR
+from algotrade.instrumentation import record_cache
+from algotrade.providers import get_provider
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+DAILY = '1d'
+
+# Start of the "full history" range, older than any listed security
+HISTORY_START = date(1900, 1, 1)
+
+# Partitions kept as ready-built frames in memory (least recently read dropped first)
+MAX_CACHED_FRAMES = 64
+
+# An empty answer (an error or rate limit on Yahoo's side) is retried after this long
+EMPTY_RETRY_SECONDS = 300
+
+# How long today's still-forming bars are reused before asking the provider again
+TAIL_TTL_SECONDS = 60
+
+
+def _to_date(value):
+    """Normalize a date, datetime or string to a plain date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _partition_name(ticker):
+    """Turn a ticker into a safe directory name (e.g. '^GSPC' -> '_GSPC')"""
+    return ''.join(ch if ch.isalnum() or ch in '-.' else '_' for ch in ticker.upper())
+
+
+def missing_ranges(covered_start, covered_end, start, end):
+    """Return the [start, end) ranges that are not yet covered locally"""
+    if covered_start is None or covered_end is None:
+        return [(start, end)]
+    ranges = []
+    if start < covered_start:
+        ranges.append((start, covered_start))
+    if end > covered_end:
+        ranges.append((covered_end, end))
+    return ranges
+
+
+def bars_frame(stamps, columns, tz=None):
+    """Build an OHLCV frame from epoch-nanosecond timestamps and column arrays"""
+    index = pd.DatetimeIndex(pd.to_datetime(np.asarray(stamps, dtype=np.int64), utc=True))
+    index = index.tz_convert(tz) if tz else index.tz_localize(None)
+    frame = pd.DataFrame(columns, index=index)
+    frame.index.name = 'Date'
+    return frame
+
+
+def slice_frame(frame, start, end):
+    """Return the rows of a date-indexed frame that fall in [start, end)"""
+    if frame is None or frame.empty:
+        return frame
+    tz = frame.index.tz
+    lo = frame.index.searchsorted(pd.Timestamp(start).tz_localize(tz))
+    hi = frame.index.searchsorted(pd.Timestamp(end).tz_localize(tz))
+    return frame.iloc[lo:hi]
+
+
+def _merge(frames):
+    """Concatenate bar frames, keeping the newest copy of duplicated dates"""
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return None
+    tz = frames[0].index.tz
+    aligned = []
+    for f in frames:
+        f = f.reindex(columns=COLUMNS)
+        if f.index.tz is None and tz is not None:
+            f.index = f.index.tz_localize(tz)
+        elif tz is not None and f.index.tz != tz:
+            f.index = f.index.tz_convert(tz)
+        aligned.append(f)
+    merged = pd.concat(aligned)
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+
+class PriceStore:
+    """Persistent per-ticker price partitions with incremental top-up"""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, 'prices')
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._frames = OrderedDict()  # (ticker, interval) -> (version, frame) of the last partition read
+        self._empty = {}  # (ticker, interval) -> when a fetch last came back empty
+        self._tails = OrderedDict()  # (ticker, interval) -> (day, fetched at, today's bars)
+
+    def _lock(self, ticker, interval=DAILY):
+        with self._locks_guard:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def _partition(self, ticker, interval=DAILY):
+        path = os.path.join(self.root, _partition_name(ticker))
+        return path if interval == DAILY else os.path.join(path, interval)
+
+    def read_meta(self, ticker, interval=DAILY):
+        """Load the partition metadata, or None if the ticker is not stored"""
+        try:
+            with open(os.path.join(self._partition(ticker, interval), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read_arrays(self, ticker, interval=DAILY):
+        """Memory-mapped (timestamps, {column: values}, meta) without building a frame"""
+        meta = self.read_meta(ticker, interval)
+        if meta is None:
+            return None, None, None
+        path = self._partition(ticker, interval)
+        version = meta['version']
+        try:
+            stamps = np.load(os.path.join(path, f"index.{version}.npy"), mmap_mode='r')
+            columns = {
+                col: np.load(os.path.join(path, f"{col}.{version}.npy"), mmap_mode='r')
+                for col in COLUMNS
+            }
+        except (OSError, ValueError):
+            # Another process replaced the partition while we were reading it
+            return None, None, None
+        return stamps, columns, meta
+
+    def read(self, ticker, interval=DAILY):
+        """Load all stored bars for a ticker as (frame, meta)"""
+        meta = self.read_meta(ticker, interval)
+        if meta is None:
+            return None, None
+        key = (ticker.upper(), interval)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == meta['version']:
+            self._frames.move_to_end(key)
+            return cached[1], meta
+        stamps, columns, meta = self.read_arrays(ticker, interval)
+        if meta is None:
+            return None, None
+        frame = bars_frame(stamps, columns, meta.get('tz'))
+        self._frames[key] = (meta['version'], frame)
+        self._frames.move_to_end(key)
+        while len(self._frames) > MAX_CACHED_FRAMES:
+            self._frames.popitem(last=False)
+        return frame, meta
+
+    def write(self, ticker, frame, covered_start, covered_end, interval=DAILY):
+        """Persist bars for a ticker and record the covered [start, end) range"""
+        path = self._partition(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+        old_meta = self.read_meta(ticker, interval)
+        version = uuid.uuid4().hex[:12]
+        price_dtype = np.float64 if interval == DAILY else np.float32
+
+        if frame is None:
+            frame = pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([]))
+        tz = str(frame.index.tz) if frame.index.tz is not None else None
+        index = frame.index.tz_convert('UTC').tz_localize(None) if tz else frame.index
+        stamps = index.values.astype('datetime64[ns]').astype(np.int64)
+        np.save(os.path.join(path, f"index.{version}.npy"), stamps)
+        for col in COLUMNS:
+            dtype = price_dtype if col in PRICE_COLUMNS else np.float64
+            np.save(os.path.join(path, f"{col}.{version}.npy"), frame[col].to_numpy(dtype=dtype))
+
+        meta = {
+            'ticker': ticker.upper(),
+            'interval': interval,
+            'version': version,
+            'tz': tz,
+            'covered_start': covered_start.isoformat(),
+            'covered_end': covered_end.isoformat(),
+            'rows': int(len(frame)),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_meta = os.path.join(path, f"meta.{version}.tmp")
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(path, 'meta.json'))
+
+        # Old column files are no longer referenced by meta.json
+        if old_meta and old_meta.get('version') != version:
+            for name in ['index'] + COLUMNS:
+                try:
+                    os.remove(os.path.join(path, f"{name}.{old_meta['version']}.npy"))
+                except OSError:
+                    pass
+
+    def _live_tail(self, key, day, end, fetch, ttl):
+        """Today's still-forming bars, kept in memory only and refreshed after ``ttl`` seconds"""
+        cached = self._tails.get(key)
+        now = time.monotonic()
+        if cached is not None and cached[0] == day:
+            self._tails.move_to_end(key)
+            if now - cached[1] < ttl:
+                return cached[2]
+        old = cached[2] if cached is not None and cached[0] == day else None
+        if old is not None and not old.empty and key[1] != DAILY:
+            # Only the newest (still forming) bar and the ones after it
+            tail = _merge([old, fetch(old.index[-1], end)])
+        else:
+            tail = fetch(day, end)
+        self._tails[key] = (day, now, tail)
+        self._tails.move_to_end(key)
+        while len(self._tails) > MAX_CACHED_FRAMES:
+            self._tails.popitem(last=False)
+        return tail
+
+    def get_history(self, ticker, start, end, fetch, include_today=False, interval=DAILY,
+                    tail_ttl=TAIL_TTL_SECONDS):
+        """Return bars for [start, end), fetching only what is missing locally.
+
+        ``fetch(start, end)`` is called with the uncovered head and/or tail range
+        and must return a date-indexed OHLCV frame (possibly empty). Pass
+        ``include_today`` once the market has closed and today's bar is final.
+
+        Empty answers are never stored (Yahoo returns them on errors and rate
+        limits) and are retried after ``EMPTY_RETRY_SECONDS``. The covered tail
+        only grows up to the day after the newest bar actually received.
+
+        Bars that are still forming (today's, unless ``include_today``) are
+        never written to disk: they are kept in memory for ``tail_ttl``
+        seconds and then topped up from the newest one on.
+        """
+        start, end = _to_date(start), _to_date(end)
+        key = (ticker.upper(), interval)
+        # Today's bar is still moving, so only mark it as covered once it is final
+        last_final = date.today() + timedelta(days=1) if include_today else date.today()
+        stored_end = min(end, last_final)
+        with self._lock(ticker, interval):
+            frame, meta = self.read(ticker, interval)
+            covered_start = _to_date(meta['covered_start']) if meta else None
+            covered_end = _to_date(meta['covered_end']) if meta else None
+
+            missing = missing_ranges(covered_start, covered_end, start, stored_end) if start < stored_end else []
+            if missing and time.monotonic() - self._empty.get(key, -EMPTY_RETRY_SECONDS) < EMPTY_RETRY_SECONDS:
+                missing = []
+            record_cache('price_store', hit=not missing)
+
+            fetched = []
+            for fetch_start, fetch_end in missing:
+                piece = fetch(fetch_start, fetch_end)
+                if piece is not None and not piece.empty:
+                    fetched.append((fetch_start, fetch_end, piece))
+            if missing and not fetched:
+                self._empty[key] = time.monotonic()
+            elif fetched:
+                self._empty.pop(key, None)
+                frame = _merge([frame] + [piece for _, _, piece in fetched])
+
+                new_start, new_end = covered_start, covered_end
+                for fetch_start, fetch_end, piece in fetched:
+                    # A non-empty answer for a head range means nothing older exists
+                    if new_start is None or fetch_start < new_start:
+                        new_start = fetch_start
+                    received_until = _to_date(piece.index[-1]) + timedelta(days=1)
+                    tail_end = min(fetch_end, last_final, received_until)
+                    new_end = tail_end if new_end is None else max(new_end, tail_end)
+                self.write(ticker, frame, new_start, max(new_end, new_start), interval)
+
+            if end > last_final:
+                frame = _merge([frame, self._live_tail(key, max(start, last_final), end, fetch, tail_ttl)])
+
+        return slice_frame(frame, start, end)
+
+    def get_full_history(self, ticker, fetch, end=None, include_today=False):
+        """Return every bar of a ticker up to ``end`` (default today).
+
+        The first call asks ``fetch`` for the range starting at ``HISTORY_START``;
+        later calls only top up the bars after the stored tail.
+        """
+        end = max(_to_date(end), date.today()) if end else date.today()
+        return self.get_history(ticker, HISTORY_START, end, fetch, include_today)
+
+
+_stores = {}
+
+
+def get_price_store(provider=None):
+    """Return the process-wide price store for a provider.
+
+    Each provider keeps its own partitions so recorded or replayed bars never
+    mix with live Yahoo Finance data.
+    """
+    provider = provider or get_provider()
+    if provider.name not in _stores:
+        _stores[provider.name] = PriceStore(os.path.join(DATA_DIR, 'prices', provider.name))
+    return _stores[provider.name]
+
+
+def load_history(symbol, start, end, provider=None, include_today=False, store=None):
+    """Return daily bars for [start, end) as a slice of the ticker's full stored history.
+
+    ``store`` defaults to the provider's process-wide price store.
+    """
+    provider = provider or get_provider()
+
+    def fetch(fetch_start, fetch_end):
+        if fetch_start <= HISTORY_START:
+            return provider.history(symbol, period='max')
+        return provider.history(symbol, start=fetch_start, end=fetch_end)
+
+    frame = (store or get_price_store(provider)).get_full_history(symbol, fetch, end, include_today)
+    return slice_frame(frame, start, end)
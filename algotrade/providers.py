@@ -0,0 +1,233 @@
+"""Market-data providers used by every page.
+
+All price downloads go through a ``MarketDataProvider`` so the pages can run
+against Yahoo Finance, or fully offline against bars recorded in a local
+directory. The provider is picked with the ``ALGOTRADE_PROVIDER`` environment
+variable:
+
+- ``yfinance`` (default): live data from Yahoo Finance
+- ``replay``: serve recorded bars from ``ALGOTRADE_REPLAY_DIR``
+- ``record``: fetch from Yahoo Finance and save every response for later replay
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from algotrade.config import DATA_DIR
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class MarketDataProvider:
+    """Base class for anything that can return OHLCV bars"""
+
+    name = 'base'
+
+    def history(self, symbol, start=None, end=None, period=None, interval='1d'):
+        """Return a date-indexed OHLCV frame for [start, end) or a period like '5y'"""
+        raise NotImplementedError
+
+    def latest_price(self, symbol):
+        """Return the most recent close, or None if the symbol has no data"""
+        data = self.history(symbol, period='1d')
+        if data is None or data.empty:
+            return None
+        return float(data['Close'].iloc[-1])
+
+    def latest_prices(self, symbols, max_workers=8):
+        """Return {symbol: latest close or None}, fetching symbols concurrently"""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+
+        def safe_price(symbol):
+            try:
+                return self.latest_price(symbol)
+            except Exception:
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+            return dict(zip(symbols, pool.map(safe_price, symbols)))
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live bars from Yahoo Finance"""
+
+    name = 'yfinance'
+
+    def history(self, symbol, start=None, end=None, period=None, interval='1d'):
+        import yfinance as yf
+
+        kwargs = {'interval': interval}
+        if start is not None:
+            kwargs['start'] = start
+            if end is not None:
+                kwargs['end'] = end
+        else:
+            kwargs['period'] = period or 'max'
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def latest_prices(self, symbols, max_workers=8):
+        """Resolve all symbols with a single batched download"""
+        import yfinance as yf
+
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        try:
+            data = yf.download(symbols, period='5d', auto_adjust=True,
+                               group_by='column', progress=False, threads=True)
+            close = data['Close']
+            if isinstance(close, pd.Series):
+                close = close.to_frame(symbols[0])
+        except Exception:
+            return super().latest_prices(symbols, max_workers)
+
+        prices = {}
+        for symbol in symbols:
+            column = close[symbol].dropna() if symbol in close.columns else None
+            prices[symbol] = float(column.iloc[-1]) if column is not None and len(column) else None
+        return prices
+
+
+def _file_name(symbol, interval):
+    safe = ''.join(ch if ch.isalnum() or ch in '-.' else '_' for ch in symbol.upper())
+    return f"{safe}.csv" if interval == '1d' else f"{safe}.{interval}.csv"
+
+
+def _period_slice(data, period):
+    """Trim a frame to a yfinance-style period ending at its last bar"""
+    if period in (None, 'max') or data.empty:
+        return data
+    count, unit = int(''.join(ch for ch in period if ch.isdigit()) or 1), period.lstrip('0123456789')
+    last = data.index[-1]
+    if unit == 'd':
+        days = pd.Index(data.index.normalize()).unique()
+        return data[data.index.normalize() >= days[-min(count, len(days))]]
+    if unit == 'ytd':
+        cutoff = last.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif unit == 'mo':
+        cutoff = last - pd.DateOffset(months=count)
+    elif unit == 'y':
+        cutoff = last - pd.DateOffset(years=count)
+    else:
+        raise ValueError(f"Unsupported period: {period}")
+    return data[data.index > cutoff]
+
+
+def _in_tz(value, tz):
+    """A date or naive time read in ``tz``; an aware time converted to it"""
+    value = pd.Timestamp(value)
+    return value.tz_localize(tz) if value.tz is None else value.tz_convert(tz)
+
+
+def _range_slice(data, start, end):
+    """Trim a frame to [start, end) using the frame's own timezone"""
+    tz = data.index.tz
+    if start is not None:
+        data = data[data.index >= _in_tz(start, tz)]
+    if end is not None:
+        data = data[data.index < _in_tz(end, tz)]
+    return data
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serve bars recorded as ``<SYMBOL>.csv`` files in a local directory"""
+
+    name = 'replay'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key not in self._frames:
+                path = os.path.join(self.directory, _file_name(symbol, interval))
+                if os.path.exists(path):
+                    data = pd.read_csv(path, index_col=0)
+                    data.index = pd.to_datetime(data.index, utc=True)
+                    data.index.name = 'Date'
+                    data = data.sort_index()
+                else:
+                    data = pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz='UTC'))
+                self._frames[key] = data
+            return self._frames[key]
+
+    def history(self, symbol, start=None, end=None, period=None, interval='1d'):
+        data = self._load(symbol, interval)
+        if start is not None:
+            return _range_slice(data, start, end)
+        return _period_slice(data, period)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Pass requests through to another provider and save the bars for replay"""
+
+    name = 'record'
+
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def history(self, symbol, start=None, end=None, period=None, interval='1d'):
+        data = self.inner.history(symbol, start=start, end=end, period=period, interval=interval)
+        if data is not None and not data.empty:
+            self._save(symbol, interval, data)
+        return data
+
+    def _save(self, symbol, interval, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, _file_name(symbol, interval))
+        bars = data.reindex(columns=BAR_COLUMNS).copy()
+        bars.index = bars.index.tz_convert('UTC') if bars.index.tz else bars.index.tz_localize('UTC')
+        with self._lock:
+            if os.path.exists(path):
+                old = pd.read_csv(path, index_col=0)
+                old.index = pd.to_datetime(old.index, utc=True)
+                bars = pd.concat([old, bars])
+                bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            bars.index.name = 'Date'
+            bars.to_csv(path)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def replay_dir():
+    """Directory that recorded bars are read from and written to"""
+    return os.environ.get('ALGOTRADE_REPLAY_DIR', os.path.join(DATA_DIR, 'replay'))
+
+
+def make_provider(kind=None):
+    """Build a provider by name (defaults to ALGOTRADE_PROVIDER)"""
+    kind = (kind or os.environ.get('ALGOTRADE_PROVIDER', 'yfinance')).lower()
+    if kind == 'yfinance':
+        return YFinanceProvider()
+    if kind == 'replay':
+        return ReplayProvider(replay_dir())
+    if kind == 'record':
+        return RecordingProvider(YFinanceProvider(), replay_dir())
+    raise ValueError(f"Unknown market data provider: {kind}")
+
+
+def get_provider():
+    """Return the process-wide market data provider"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = make_provider()
+        return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (used by benchmarks and scripts)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
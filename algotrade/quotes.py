@@ -0,0 +1,67 @@
+"""Short-lived cache of latest prices shared by every caller in the process.
+
+Pages ask for all the symbols they need at once; cached quotes are reused and
+only the stale ones are resolved, in one batched provider call.
+"""
+import threading
+import time
+
+from algotrade.instrumentation import record_cache
+from algotrade.providers import get_provider
+
+QUOTE_TTL_SECONDS = 60
+
+
+class QuoteCache:
+    """Thread-safe {symbol: (price, fetched_at)} map with a fixed TTL"""
+
+    def __init__(self, ttl=QUOTE_TTL_SECONDS):
+        self.ttl = ttl
+        self._quotes = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, symbols, now=None):
+        """Return (fresh quotes, symbols that still need fetching)"""
+        now = now or time.time()
+        fresh, stale = {}, []
+        with self._lock:
+            for symbol in symbols:
+                quote = self._quotes.get(symbol)
+                if quote and now - quote[1] < self.ttl:
+                    fresh[symbol] = quote[0]
+                else:
+                    stale.append(symbol)
+        return fresh, stale
+
+    def put_many(self, prices, now=None):
+        now = now or time.time()
+        with self._lock:
+            for symbol, price in prices.items():
+                # Failed lookups are not cached so a typo can be retried
+                if price is not None:
+                    self._quotes[symbol] = (price, now)
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+
+_cache = QuoteCache()
+
+
+def get_quotes(symbols, provider=None):
+    """Return {symbol: latest price or None} for every requested symbol"""
+    symbols = [s.upper() for s in dict.fromkeys(symbols) if s]
+    fresh, stale = _cache.get_many(symbols)
+    record_cache('quotes', hit=True, count=len(fresh))
+    record_cache('quotes', hit=False, count=len(stale))
+    if stale:
+        fetched = (provider or get_provider()).latest_prices(stale)
+        _cache.put_many(fetched)
+        fresh.update(fetched)
+    return {symbol: fresh.get(symbol) for symbol in symbols}
+
+
+def get_quote(symbol, provider=None):
+    """Return the latest price for one symbol, or None"""
+    return get_quotes([symbol], provider).get(symbol.upper())
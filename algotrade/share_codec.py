@@ -0,0 +1,161 @@
+"""Compact, versioned encoding of a paper-trading portfolio for share links.
+
+Version 2 packs the portfolio into a small binary record and compresses it
+with zlib before base64url-encoding it:
+
+* header: magic ``AT``, version byte, cash and starting cash in cents (struct)
+* symbol table, then holdings as (symbol number, shares)
+* the trade ledger with minute timestamps stored as deltas from the previous
+  trade, prices in cents and every integer as a variable-length varint
+
+The daily ``history`` snapshots are not included any more -- the trader page
+rebuilds the curve from the ledger -- so the link size depends on the number
+of trades only. Version 1 links (base64 of the raw JSON) still decode.
+
+The trader page executes every trade at a whole-cent price, so storing cash
+and prices in cents is exact: cash rebuilt from the ledger matches the header.
+"""
+import base64
+import json
+import struct
+import zlib
+from datetime import datetime, timezone
+
+MAGIC = b'AT'
+VERSION = 2
+_HEADER = struct.Struct('<2sBqq')
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _write_varint(out, value):
+    """Unsigned LEB128"""
+    if value < 0:
+        raise ValueError(f"varint needs a non-negative value, got {value}")
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def _cents(amount):
+    return int(round(amount * 100))
+
+
+def _minutes(timestamp):
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((moment - _EPOCH).total_seconds() // 60)
+
+
+def pack_portfolio(portfolio, cash, trades=(), starting_cash=None):
+    """Binary version-2 record (before compression)"""
+    trades = list(trades)
+    symbols = sorted(set(portfolio) | {t['symbol'] for t in trades})
+    number = {symbol: i for i, symbol in enumerate(symbols)}
+    starting_cash = cash if starting_cash is None else starting_cash
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, _cents(cash), _cents(starting_cash)))
+    _write_varint(out, len(symbols))
+    for symbol in symbols:
+        name = symbol.encode('ascii')
+        _write_varint(out, len(name))
+        out += name
+
+    _write_varint(out, len(portfolio))
+    for symbol, info in portfolio.items():
+        _write_varint(out, number[symbol])
+        _write_varint(out, int(info['shares']))
+
+    _write_varint(out, len(trades))
+    previous = 0
+    for trade in trades:
+        minute = _minutes(trade['time'])
+        _write_varint(out, _zigzag(minute - previous))
+        previous = minute
+        _write_varint(out, number[trade['symbol']])
+        _write_varint(out, _zigzag(int(trade['shares'])))
+        _write_varint(out, _cents(trade['price']))
+    return bytes(out)
+
+
+def unpack_portfolio(data):
+    """Inverse of ``pack_portfolio``: a dict with portfolio, cash, starting_cash and trades"""
+    magic, version, cash, starting_cash = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported share link version {version}")
+    pos = _HEADER.size
+
+    count, pos = _read_varint(data, pos)
+    symbols = []
+    for _ in range(count):
+        length, pos = _read_varint(data, pos)
+        symbols.append(data[pos:pos + length].decode('ascii'))
+        pos += length
+
+    portfolio = {}
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        index, pos = _read_varint(data, pos)
+        shares, pos = _read_varint(data, pos)
+        portfolio[symbols[index]] = {'shares': shares, 'cash': 0.0}
+
+    trades = []
+    count, pos = _read_varint(data, pos)
+    minute = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        minute += _unzigzag(delta)
+        index, pos = _read_varint(data, pos)
+        shares, pos = _read_varint(data, pos)
+        price, pos = _read_varint(data, pos)
+        trades.append({
+            'time': datetime.fromtimestamp(minute * 60, timezone.utc).replace(tzinfo=None).isoformat(timespec='seconds'),
+            'symbol': symbols[index],
+            'shares': _unzigzag(shares),
+            'price': price / 100,
+        })
+
+    return {
+        'portfolio': portfolio,
+        'cash': cash / 100,
+        'starting_cash': starting_cash / 100,
+        'trades': trades,
+    }
+
+
+def encode_share(portfolio, cash, trades=(), starting_cash=None):
+    """URL-safe text for the ``data`` query parameter"""
+    packed = zlib.compress(pack_portfolio(portfolio, cash, trades, starting_cash), 9)
+    return base64.urlsafe_b64encode(packed).decode().rstrip('=')
+
+
+def decode_share(text):
+    """Decode a version-2 link, or a version-1 link holding base64 JSON"""
+    raw = base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+    if raw[:1] == b'{':
+        return json.loads(raw.decode())
+    return unpack_portfolio(zlib.decompress(raw))
@@ -0,0 +1,237 @@
+"""Size-bounded LRU cache shared by every Streamlit worker on the machine.
+
+Entries live in one SQLite file (WAL mode, so readers never block the writer)
+under ``DATA_DIR``, which lets several app processes reuse each other's
+downloads and computed results. The cache has a byte budget: once the stored
+values grow past it, the least recently used entries are evicted. Hits and
+misses are counted per cache name, both in the current rerun's metrics and in
+the file itself so the totals cover all workers.
+
+Lookups are pure reads: hit/miss counts and "last used" times are collected in
+memory and written in one batch with the next ``set`` or every
+``FLUSH_SECONDS``, so readers don't queue on the write lock.
+
+Raw price history is not stored here: the price store already keeps each
+ticker's full history on disk and slices any date range out of it.
+"""
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from algotrade.config import DATA_DIR
+from algotrade.instrumentation import record_cache
+from algotrade.providers import get_provider
+
+CACHE_PATH = os.environ.get('ALGOTRADE_CACHE_PATH', os.path.join(DATA_DIR, 'cache.sqlite'))
+CACHE_MAX_BYTES = int(float(os.environ.get('ALGOTRADE_CACHE_MB', '256')) * 1024 * 1024)
+DEFAULT_TTL = 3600
+FLUSH_SECONDS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SharedCache:
+    """Pickled values in SQLite with a TTL per entry and LRU eviction by size"""
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path or CACHE_PATH
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending_stats = {}   # name -> {'hits': n, 'misses': n} not yet written
+        self._pending_touch = {}   # key -> last_used not yet written
+        self._flushed = time.monotonic()
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, conn, name, column, count=1):
+        conn.execute(f"INSERT INTO stats (name, {column}) VALUES (?, ?) "
+                     f"ON CONFLICT(name) DO UPDATE SET {column} = {column} + excluded.{column}",
+                     (name, count))
+
+    def _note(self, key, name, hit, now):
+        """Remember a lookup in memory until the next flush"""
+        with self._pending_lock:
+            counts = self._pending_stats.setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+            if hit:
+                self._pending_touch[key] = now
+            due = time.monotonic() - self._flushed >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def _write_pending(self, conn):
+        """Write the buffered stats and LRU times inside the caller's transaction"""
+        with self._pending_lock:
+            stats, touched = self._pending_stats, self._pending_touch
+            self._pending_stats, self._pending_touch = {}, {}
+            self._flushed = time.monotonic()
+        for name, counts in stats.items():
+            for column, count in counts.items():
+                if count:
+                    self._count(conn, name, column, count)
+        conn.executemany('UPDATE entries SET last_used = MAX(last_used, ?) WHERE key = ?',
+                         [(used, key) for key, used in touched.items()])
+
+    def flush(self):
+        """Write the buffered hit/miss counts and last-used times in one transaction"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._write_pending(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, key, name='default'):
+        """Return (found, value); expired entries count as misses"""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+        hit = row is not None and row[1] > now
+        if hit:
+            try:
+                value = pickle.loads(row[0])
+            except Exception:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                hit = False
+        record_cache(name, hit=hit)
+        self._note(key, name, hit, now)
+        return (True, value) if hit else (False, None)
+
+    def set(self, key, value, ttl=DEFAULT_TTL, name='default'):
+        """Store a value, then evict least recently used entries over the budget"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return  # would evict everything else and still not fit
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._write_pending(conn)
+            conn.execute('INSERT OR REPLACE INTO entries (key, value, size, expires, last_used) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, sqlite3.Binary(blob), len(blob), now + ttl, now))
+            evicted = self._evict(conn, now)
+            if evicted:
+                self._count(conn, name, 'evictions', evicted)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the oldest ones until the budget holds"""
+        evicted = conn.execute('DELETE FROM entries WHERE expires <= ?', (now,)).rowcount
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+        doomed = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', doomed)
+        return evicted + len(doomed)
+
+    def get_or_set(self, key, compute, ttl=DEFAULT_TTL, name='default'):
+        """Return the cached value for ``key``, computing and storing it on a miss"""
+        found, value = self.get(key, name)
+        if not found:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl, name)
+        return value
+
+    def stats(self):
+        """Entry count, stored bytes and per-cache hit/miss/eviction totals"""
+        self.flush()
+        conn = self._connect()
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        caches = {name: {'hits': hits, 'misses': misses, 'evictions': evictions}
+                  for name, hits, misses, evictions in conn.execute('SELECT * FROM stats')}
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'caches': caches}
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending_stats, self._pending_touch = {}, {}
+        conn = self._connect()
+        conn.execute('DELETE FROM entries')
+        conn.execute('DELETE FROM stats')
+
+
+_cache = None
+
+
+def get_shared_cache():
+    """Return the process-wide handle on the shared cache file"""
+    global _cache
+    if _cache is None:
+        _cache = SharedCache()
+    return _cache
+
+
+def memoize(name, ttl=DEFAULT_TTL):
+    """Decorator caching a function's result under its name and arguments.
+
+    A drop-in for ``st.cache_data`` on functions with simple (repr-able)
+    arguments. ``None`` results are not cached so failures are retried.
+    Keys include the provider name, so replayed or recorded runs never share
+    entries with live Yahoo Finance data.
+
+    ``wrapper.lookup(...)`` only reads the cache and returns (found, value);
+    ``wrapper.refresh(...)`` computes and stores without looking first. Together
+    they let a caller check many keys on its own thread and hand only the
+    misses to a worker pool.
+    """
+    def decorator(fn):
+        def key_for(args, kwargs):
+            return (f"{name}:{get_provider().name}:{fn.__module__}.{fn.__qualname__}:"
+                    f"{args!r}:{sorted(kwargs.items())!r}")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return get_shared_cache().get_or_set(key_for(args, kwargs), lambda: fn(*args, **kwargs), ttl, name)
+
+        def lookup(*args, **kwargs):
+            return get_shared_cache().get(key_for(args, kwargs), name)
+
+        def refresh(*args, **kwargs):
+            value = fn(*args, **kwargs)
+            if value is not None:
+                get_shared_cache().set(key_for(args, kwargs), value, ttl, name)
+            return value
+
+        wrapper.lookup, wrapper.refresh = lookup, refresh
+        return wrapper
+    return decorator
+
@@ -0,0 +1,109 @@
+"""Rule-based strategies: indicator signals turned into positions and P&L.
+
+A strategy produces two boolean arrays, ``entries`` and ``exits``. They are
+turned into a long/flat position by forward-filling the last signal (no loop
+over bars), the position is applied from the next bar on, and the equity curve
+follows from one cumulative product of the position-weighted returns.
+"""
+import numpy as np
+
+from algotrade.backtest import TRADING_DAYS
+from algotrade.drawdown import underwater_curve
+from algotrade.indicators import bollinger, macd, rsi, sma
+
+
+def _crosses_above(a, b):
+    """True on the bars where ``a`` moves from at-or-below ``b`` to above it"""
+    with np.errstate(invalid='ignore'):
+        above = a > b
+    cross = np.zeros(len(a), dtype=bool)
+    cross[1:] = above[1:] & ~above[:-1] & ~np.isnan(a[:-1]) & ~np.isnan(b[:-1])
+    return cross
+
+
+def sma_crossover(close, fast=20, slow=50):
+    """Buy when the fast average crosses above the slow one, sell on the reverse"""
+    fast_line, slow_line = sma(close, fast), sma(close, slow)
+    return _crosses_above(fast_line, slow_line), _crosses_above(slow_line, fast_line)
+
+
+def rsi_reversion(close, window=14, oversold=30, overbought=70):
+    """Buy when RSI falls below ``oversold``, sell when it rises above ``overbought``"""
+    values = rsi(close, window)
+    with np.errstate(invalid='ignore'):
+        return values < oversold, values > overbought
+
+
+def macd_crossover(close, fast=12, slow=26, signal=9):
+    """Buy when MACD crosses above its signal line, sell on the reverse"""
+    line, signal_line, _ = macd(close, fast, slow, signal)
+    return _crosses_above(line, signal_line), _crosses_above(signal_line, line)
+
+
+def bollinger_reversion(close, window=20, width=2.0):
+    """Buy below the lower band, sell once the price is back above the middle"""
+    close = np.asarray(close, dtype=float)
+    middle, _, lower = bollinger(close, window, width)
+    with np.errstate(invalid='ignore'):
+        return close < lower, close > middle
+
+
+def positions_from_signals(entries, exits):
+    """Long (1) / flat (0) position held after each bar; exits win on ties"""
+    entries, exits = np.asarray(entries, dtype=bool), np.asarray(exits, dtype=bool)
+    state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    # Forward-fill the last signal with a running maximum over row numbers
+    rows = np.where(np.isnan(state), 0, np.arange(len(state)))
+    filled = state[np.maximum.accumulate(rows)]
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def signal_backtest(close, entries, exits, amount=1000.0, cost_bps=0.0, periods_per_year=TRADING_DAYS):
+    """Equity curve and statistics of trading long/flat on the given signals.
+
+    A signal on bar ``i`` is acted on at that bar's close, so the position
+    earns the return from bar ``i`` to ``i + 1``. ``cost_bps`` is charged on
+    every buy and sell, in basis points of the traded value.
+    """
+    close = np.asarray(close, dtype=float)
+    position = positions_from_signals(entries, exits)
+    changes = np.diff(np.concatenate([[0.0], position]))
+    returns = close[1:] / close[:-1] - 1
+    held = position[:-1]
+    strategy_returns = held * returns - np.abs(changes[:-1]) * cost_bps / 10000
+
+    equity = amount * np.concatenate([[1.0], np.cumprod(1 + strategy_returns)])
+    buy_and_hold = amount * close / close[0]
+
+    # Per-trade results: sum the log returns of each holding period by trade number
+    trade_id = np.cumsum(changes > 0)[:-1]
+    log_returns = np.log1p(strategy_returns)
+    trades = int((changes > 0).sum())
+    per_trade = np.bincount(trade_id[held > 0], weights=log_returns[held > 0], minlength=trades + 1)[1:]
+    volatility = strategy_returns.std(ddof=1) * np.sqrt(periods_per_year) * 100 if len(strategy_returns) > 1 else 0.0
+
+    return {
+        'position': position,
+        'equity': equity,
+        'buy_and_hold': buy_and_hold,
+        'returns': strategy_returns,
+        'buys': np.flatnonzero(changes > 0),
+        'sells': np.flatnonzero(changes < 0),
+        'final_value': float(equity[-1]),
+        'return_percentage': float((equity[-1] / amount - 1) * 100),
+        'buy_and_hold_percentage': float((close[-1] / close[0] - 1) * 100),
+        'trades': trades,
+        'win_rate': float((per_trade > 0).mean() * 100) if len(per_trade) else 0.0,
+        'exposure': float(held.mean() * 100) if len(held) else 0.0,
+        'volatility': float(volatility),
+        'max_drawdown': float(underwater_curve(equity).min() * 100),
+    }
+
+
+# Strategy name -> (signal function, {parameter: default})
+STRATEGIES = {
+    'SMA Crossover': (sma_crossover, {'fast': 20, 'slow': 50}),
+    'RSI Mean Reversion': (rsi_reversion, {'window': 14, 'oversold': 30, 'overbought': 70}),
+    'MACD Crossover': (macd_crossover, {'fast': 12, 'slow': 26, 'signal': 9}),
+    'Bollinger Bands': (bollinger_reversion, {'window': 20, 'width': 2.0}),
+}
@@ -0,0 +1,78 @@
+"""Fixed set of tickers the pages offer, known before any user arrives.
+
+Kept in one place so the pages and the cache warm-up job agree on it.
+"""
+
+# S&P 500 ETF used for beta and correlation on the backtesting page
+BENCHMARK_TICKER = 'SPY'
+
+# Expanded stock selection with categories including more crypto
+STOCK_CATEGORIES = {
+    'Technology': {
+        'Apple Inc.': 'AAPL',
+        'Microsoft Corporation': 'MSFT',
+        'Alphabet Inc.': 'GOOGL',
+        'Amazon.com Inc.': 'AMZN',
+        'Meta Platforms Inc.': 'META',
+        'Netflix Inc.': 'NFLX',
+        'Adobe Inc.': 'ADBE',
+        'Salesforce Inc.': 'CRM',
+        'NVIDIA Corporation': 'NVDA',
+        'Intel Corporation': 'INTC'
+    },
+    'Consumer & Retail': {
+        'Tesla Inc.': 'TSLA',
+        'The Walt Disney Company': 'DIS',
+        'McDonald\'s Corporation': 'MCD',
+        'Nike Inc.': 'NKE',
+        'The Coca-Cola Company': 'KO',
+        'Starbucks Corporation': 'SBUX',
+        'The Home Depot Inc.': 'HD',
+        'Walmart Inc.': 'WMT',
+        'Procter & Gamble Co.': 'PG',
+        'Johnson & Johnson': 'JNJ'
+    },
+    'Financial Services': {
+        'Berkshire Hathaway Inc.': 'BRK-B',
+        'JPMorgan Chase & Co.': 'JPM',
+        'Bank of America Corp.': 'BAC',
+        'Wells Fargo & Company': 'WFC',
+        'The Goldman Sachs Group': 'GS',
+        'American Express Company': 'AXP',
+        'PayPal Holdings Inc.': 'PYPL',
+        'Visa Inc.': 'V',
+        'Mastercard Incorporated': 'MA'
+    },
+    'Cryptocurrency (Direct & ETFs)': {
+        'Bitcoin USD': 'BTC-USD',
+        'Ethereum USD': 'ETH-USD',
+        'Cardano USD': 'ADA-USD',
+        'Solana USD': 'SOL-USD',
+        'Dogecoin USD': 'DOGE-USD',
+        'ProShares Bitcoin Strategy ETF': 'BITO',
+        'Grayscale Bitcoin Trust': 'GBTC',
+        'Grayscale Ethereum Trust': 'ETHE',
+        'Coinbase Global Inc.': 'COIN'
+    }
+}
+
+
+# Stock market indices with their tickers and average returns
+STOCK_INDICES = {
+    "S&P 500 (SPY)": "SPY",
+    "NASDAQ-100 (QQQ)": "QQQ",
+    "Dow Jones (DIA)": "DIA",
+    "MSCI World (URTH)": "URTH",
+    "S&P 500 Growth (IVW)": "IVW"
+}
+
+
+def universe_tickers():
+    """Every distinct ticker used by the pages, in a stable order"""
+    tickers = [BENCHMARK_TICKER]
+    for sector in STOCK_CATEGORIES.values():
+        tickers.extend(sector.values())
+    tickers.extend(STOCK_INDICES.values())
+    # GBTC doubles as the Bitcoin proxy when BTC-USD has no data
+    tickers.append('GBTC')
+    return list(dict.fromkeys(tickers))
@@ -0,0 +1,126 @@
+"""Preload the ticker universe into the price store before anyone asks for it.
+
+``start_background_warmup`` is called from the pages and starts (once per
+process) a thread that downloads every ticker in ``universe_tickers`` in
+parallel, then sleeps until half an hour after the US market close and tops
+the store up again with the day's final bars. Interactive requests are then
+answered from local data. The same job can be run from cron::
+
+    python -m algotrade.warmup
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as clock, timedelta
+
+import pandas as pd
+
+from algotrade.price_store import load_history
+from algotrade.providers import get_provider
+from algotrade.universe import universe_tickers
+
+MARKET_TZ = 'America/New_York'
+MARKET_CLOSE = clock(16, 0)
+# Give the data provider time to publish the final daily bars
+REFRESH_DELAY = timedelta(minutes=30)
+WARMUP_ENABLED = os.environ.get('ALGOTRADE_WARMUP', 'on').lower() not in ('0', 'off', 'false')
+
+
+def _refresh_time(day):
+    """Moment after the close on ``day`` (market time, DST-aware) when bars are final"""
+    return pd.Timestamp(datetime.combine(day, MARKET_CLOSE)).tz_localize(MARKET_TZ) + REFRESH_DELAY
+
+
+def market_closed(now=None):
+    """True once today's US session is over (weekends count as closed)"""
+    now = now or pd.Timestamp.now(tz=MARKET_TZ)
+    return now.weekday() >= 5 or now >= _refresh_time(now.date())
+
+
+def next_refresh(now=None):
+    """The next weekday moment after the close at which to refresh the store"""
+    now = now or pd.Timestamp.now(tz=MARKET_TZ)
+    day = now.date()
+    if now >= _refresh_time(day):
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return _refresh_time(day)
+
+
+def warm_up(symbols=None, provider=None, max_workers=8, settle=None):
+    """Load every symbol's full history into the price store in parallel.
+
+    With ``settle`` (default: whether the market has closed) today's stock bars
+    are stored as final. Crypto trades around the clock, so its bar never is.
+    Returns {symbol: error message} for the downloads that failed.
+    """
+    symbols = symbols or universe_tickers()
+    provider = provider or get_provider()
+    if settle is None:
+        settle = market_closed()
+    today = date.today()
+
+    def load(symbol):
+        include_today = settle and not symbol.endswith('-USD')
+        end = today + timedelta(days=1) if include_today else today
+        try:
+            load_history(symbol, today - timedelta(days=7), end, provider, include_today)
+        except Exception as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        errors = dict(zip(symbols, pool.map(load, symbols)))
+    return {symbol: error for symbol, error in errors.items() if error is not None}
+
+
+def _refresh_loop(provider):
+    while True:
+        try:
+            warm_up(provider=provider)
+        except Exception as e:
+            print(f"Price warm-up failed: {e}")
+        delay = (next_refresh() - pd.Timestamp.now(tz=MARKET_TZ)).total_seconds()
+        time.sleep(max(delay, 60))
+
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def start_background_warmup():
+    """Start the warm-up thread once per process (a no-op after the first call)"""
+    global _started
+    if not WARMUP_ENABLED:
+        return
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+    thread = threading.Thread(target=_refresh_loop, args=(get_provider(),),
+                              name='algotrade-warmup', daemon=True)
+    thread.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preload ticker histories into the local price store.")
+    parser.add_argument('symbols', nargs='*', help="tickers to load (default: every ticker the pages use)")
+    parser.add_argument('--workers', type=int, default=8, help="parallel downloads")
+    parser.add_argument('--settle', action='store_true',
+                        help="store today's bar as final even if the market looks open")
+    args = parser.parse_args(argv)
+
+    symbols = [s.upper() for s in args.symbols] or universe_tickers()
+    started = time.perf_counter()
+    errors = warm_up(symbols, max_workers=args.workers, settle=True if args.settle else None)
+    print(f"Warmed {len(symbols) - len(errors)}/{len(symbols)} tickers in {time.perf_counter() - started:.1f}s")
+    for symbol, error in errors.items():
+        print(f"  {symbol}: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,309 @@
+"""Benchmarks for the data-fetch, compute and render stages of every page.
+
+Each page's core computation runs against fixed price fixtures served by the
+replay provider, so no network is used and compute can be timed separately
+from Yahoo Finance latency. Results are written as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # full run, JSON to stdout
+    python benchmarks/run_benchmarks.py --quick          # small sizes only
+    python benchmarks/run_benchmarks.py --output bench.json --repeat 7
+
+By default the fixtures are synthetic but deterministic (seeded random walks
+written once to benchmarks/fixtures). Pass ``--fixtures DIR`` to use bars
+recorded with ``ALGOTRADE_PROVIDER=record`` instead.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algotrade.analysis import calculate_returns  # noqa: E402
+from algotrade.backtest import align_closes, rank_assets, simulate_plan  # noqa: E402
+from algotrade.compounding import compound_balance, retirement_grid, total_deposits  # noqa: E402
+from algotrade.metrics import cagr  # noqa: E402
+from algotrade.portfolio import portfolio_value  # noqa: E402
+from algotrade.price_store import PriceStore, load_history  # noqa: E402
+from algotrade.providers import BAR_COLUMNS, ReplayProvider  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_END = pd.Timestamp('2025-01-01')
+FIXTURE_YEARS = 30
+FIXTURE_TICKERS = 100
+FIXTURE_SEED = 42
+
+PERIODS = {'6mo': 0.5, '1y': 1, '5y': 5, '10y': 10, '30y': 30}
+TICKER_COUNTS = [1, 10, 50, 100]
+QUICK_PERIODS = {'6mo': 0.5, '5y': 5}
+QUICK_TICKER_COUNTS = [1, 10]
+
+
+# -------------------- Fixtures --------------------
+def fixture_symbols(count):
+    return [f"SYN{i:03d}" for i in range(count)]
+
+
+def write_fixtures(directory, count=FIXTURE_TICKERS, years=FIXTURE_YEARS, seed=FIXTURE_SEED):
+    """Write deterministic daily bars in the replay provider's CSV format"""
+    manifest = os.path.join(directory, 'manifest.json')
+    expected = {'count': count, 'years': years, 'seed': seed, 'end': FIXTURE_END.isoformat()}
+    try:
+        with open(manifest) as f:
+            if json.load(f) == expected:
+                return
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(FIXTURE_END - pd.DateOffset(years=years), FIXTURE_END, tz='UTC')
+    for symbol in fixture_symbols(count):
+        drift, vol = rng.uniform(-0.0002, 0.0008), rng.uniform(0.008, 0.04)
+        close = rng.uniform(10, 500) * np.cumprod(1 + rng.normal(drift, vol, len(dates)))
+        spread = np.abs(rng.normal(0, vol / 2, len(dates))) * close
+        bars = pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, vol / 4, len(dates))),
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, len(dates)),
+        }, index=dates)[BAR_COLUMNS]
+        bars.index.name = 'Date'
+        bars.to_csv(os.path.join(directory, f"{symbol}.csv"))
+    with open(manifest, 'w') as f:
+        json.dump(expected, f)
+
+
+# -------------------- Timing --------------------
+def timed(fn, repeat):
+    """Run ``fn`` ``repeat`` times; return its last result and the samples in ms"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, samples
+
+
+def record(results, page, stage, samples, **size):
+    results.append({
+        'page': page,
+        'stage': stage,
+        **size,
+        'runs': len(samples),
+        'min_ms': round(min(samples), 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'max_ms': round(max(samples), 4),
+    })
+
+
+def period_range(years):
+    return (FIXTURE_END - pd.DateOffset(days=int(365 * years))).date(), FIXTURE_END.date()
+
+
+# -------------------- Renderers (mirror what the pages build) --------------------
+def plotly_line_figure(series_by_name):
+    import plotly.graph_objects as go
+    from algotrade.charts import line_trace
+
+    fig = go.Figure()
+    for name, series in series_by_name.items():
+        fig.add_trace(line_trace(series.index, series.values, mode='lines', name=name))
+    fig.update_layout(template='plotly_white', hovermode='x unified', height=500)
+    # Streamlit ships the figure to the browser as JSON
+    return fig.to_json()
+
+
+def matplotlib_growth_figure(years, balance, deposits):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.plot(range(years + 1), balance, label="With Compound Interest")
+    ax.plot(range(years + 1), deposits, label="No Interest (just deposits)")
+    ax.legend(loc='upper left')
+    ax.grid(True)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getbuffer().nbytes
+
+
+def optional(renderer):
+    """Skip render stages when the charting library is not installed"""
+    try:
+        renderer()
+        return True
+    except ImportError:
+        return False
+
+
+# -------------------- Page benchmarks --------------------
+def bench_backtester(provider, periods, counts, repeat, results):
+    page = 'investment_backtesting_tool'
+    benchmark_symbol = fixture_symbols(1)[0]
+    can_render = optional(lambda: plotly_line_figure({}))
+
+    for label, years in periods.items():
+        start, end = period_range(years)
+
+        def fetch_history(store, symbol):
+            # What the pages run: full-history fetch into the store, then a slice
+            return load_history(symbol, start, end, provider, store=store)
+
+        # Single asset: calculate_returns
+        store_dir = tempfile.mkdtemp(prefix='algotrade-bench-')
+        try:
+            _, cold = timed(lambda: fetch_history(PriceStore(tempfile.mkdtemp(dir=store_dir)), benchmark_symbol), repeat)
+            warm_store = PriceStore(os.path.join(store_dir, 'warm'))
+            data = fetch_history(warm_store, benchmark_symbol)
+            _, warm = timed(lambda: fetch_history(warm_store, benchmark_symbol), repeat)
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+        record(results, page, 'fetch_cold', cold, period=label, tickers=1, rows=len(data))
+        record(results, page, 'fetch_warm', warm, period=label, tickers=1, rows=len(data))
+
+        _, samples = timed(lambda: calculate_returns(data, 1000, data['Close']), repeat)
+        record(results, page, 'compute', samples, period=label, tickers=1, rows=len(data))
+        if can_render:
+            _, samples = timed(lambda: plotly_line_figure({'Close': data['Close']}), repeat)
+            record(results, page, 'render', samples, period=label, tickers=1, rows=len(data))
+
+        # Sector comparison: N assets aligned, ranked and simulated together
+        for count in counts:
+            if count == 1:
+                continue
+            symbols = fixture_symbols(count)
+            frames, samples = timed(
+                lambda: {s: provider.history(s, start=start, end=end)[['Close']] for s in symbols}, repeat)
+            record(results, page, 'fetch_sector', samples, period=label, tickers=count)
+
+            def compute_sector():
+                dates, names, prices, observed = align_closes(frames)
+                rank_assets(prices, names, observed)
+                return simulate_plan(prices, np.ones(len(names)), dates, 1000, contribution=100,
+                                     rebalance_frequency='Quarterly')
+            _, samples = timed(compute_sector, repeat)
+            record(results, page, 'compute_sector', samples, period=label, tickers=count)
+            if can_render:
+                closes = {s: f['Close'] for s, f in frames.items()}
+                _, samples = timed(lambda: plotly_line_figure(closes), repeat)
+                record(results, page, 'render_sector', samples, period=label, tickers=count)
+
+
+def bench_inflation(provider, periods, counts, repeat, results):
+    page = 'inflation'
+    for label, years in periods.items():
+        start, end = period_range(years)
+        for count in counts:
+            symbols = fixture_symbols(count)
+            frames, samples = timed(
+                lambda: [provider.history(s, start=start, end=end) for s in symbols], repeat)
+            record(results, page, 'fetch', samples, period=label, tickers=count)
+            _, samples = timed(
+                lambda: [cagr(f['Close'].to_numpy(dtype=float), years) for f in frames], repeat)
+            record(results, page, 'compute', samples, period=label, tickers=count)
+
+
+def bench_compounding(repeat, results):
+    page = 'ribit_de_ribit'
+    can_render = optional(lambda: matplotlib_growth_figure(1, [0, 1], [0, 1]))
+    for years in [1, 5, 10, 20, 40]:
+        marks = np.arange(years + 1) * 12
+
+        def compute():
+            return (compound_balance(5000, 500, 7.0, marks),
+                    total_deposits(5000, 500, marks))
+        (balance, deposits), samples = timed(compute, repeat)
+        record(results, page, 'compute', samples, years=years)
+        if can_render:
+            _, samples = timed(lambda: matplotlib_growth_figure(years, balance, deposits), repeat)
+            record(results, page, 'render', samples, years=years)
+
+    _, samples = timed(lambda: retirement_grid(np.arange(20, 60), np.arange(100, 5001, 100),
+                                               [2.0, 7.0, 12.0], initial=5000), repeat)
+    record(results, page, 'compute_grid', samples, cells=40 * 50 * 3)
+
+
+def bench_trader(provider, periods, counts, repeat, results):
+    page = 'trader'
+    can_render = optional(lambda: plotly_line_figure({}))
+    for count in counts:
+        symbols = fixture_symbols(count)
+        portfolio = {s: {'shares': 10, 'cash': 0.0} for s in symbols}
+        prices, samples = timed(lambda: provider.latest_prices(symbols), repeat)
+        record(results, page, 'fetch', samples, tickers=count)
+
+        def compute():
+            total = portfolio_value(portfolio, 1000.0, prices)
+            rows = [{'Symbol': s, 'Shares': info['shares'], 'Value': prices[s] * info['shares']}
+                    for s, info in portfolio.items()]
+            return total, pd.DataFrame(rows)
+        _, samples = timed(compute, repeat)
+        record(results, page, 'compute', samples, tickers=count)
+
+    if can_render:
+        for label, years in periods.items():
+            days = pd.date_range(end=FIXTURE_END, periods=max(int(365 * years), 2), freq='D')
+            history = pd.Series(np.linspace(1000, 1500, len(days)), index=days)
+            _, samples = timed(lambda: plotly_line_figure({'Total Value': history}), repeat)
+            record(results, page, 'render', samples, period=label, rows=len(days))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=None, help="directory of recorded CSV bars (default: synthetic)")
+    parser.add_argument('--output', default=None, help="write JSON here instead of stdout")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per measurement")
+    parser.add_argument('--quick', action='store_true', help="only the smallest sizes")
+    args = parser.parse_args(argv)
+
+    fixtures = args.fixtures or FIXTURE_DIR
+    if args.fixtures is None:
+        write_fixtures(fixtures)
+    provider = ReplayProvider(fixtures)
+
+    periods = QUICK_PERIODS if args.quick else PERIODS
+    counts = QUICK_TICKER_COUNTS if args.quick else TICKER_COUNTS
+
+    results = []
+    bench_backtester(provider, periods, counts, args.repeat, results)
+    bench_inflation(provider, periods, counts, args.repeat, results)
+    bench_compounding(args.repeat, results)
+    bench_trader(provider, periods, counts, args.repeat, results)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'fixtures': os.path.abspath(fixtures),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
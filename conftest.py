@@ -0,0 +1 @@
+# Lets pytest import the algotrade package when run from the repository root
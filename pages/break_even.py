@@ -1,6 +1,9 @@
 import streamlit as st
 
+from algotrade.instrumentation import begin_rerun, finish_rerun, span
+
 st.set_page_config(page_title="Break Even Game", page_icon="📉", layout="centered")
+begin_rerun("break_even")
 
 st.title("📉 Break Even Game!")
 st.write("Learn how when a stock falls, it needs a bigger % rise to break even.")
@@ -16,9 +19,10 @@ This is because the new value is smaller.
 percent_drop = st.slider("Choose how much % the stock fell:", min_value=1, max_value=95, value=10)
 
 # Compute break-even % rise
-drop_fraction = percent_drop / 100
-remaining_fraction = 1 - drop_fraction
-percent_needed_up = (1 / remaining_fraction - 1) * 100
+with span("compute.break_even"):
+    drop_fraction = percent_drop / 100
+    remaining_fraction = 1 - drop_fraction
+    percent_needed_up = (1 / remaining_fraction - 1) * 100
 
 # Display result
 st.subheader(f"📉 The stock fell by {percent_drop} %")
@@ -33,3 +37,4 @@ st.write("⬆️ Rise needed to break even")
 # Fun tip for kids
 st.info("💡 The more a stock falls, the harder it is to recover! Be patient and think long-term! 🚀")
 
+finish_rerun()
@@ -1,15 +1,24 @@
 import streamlit as st
 import plotly.graph_objects as go
-import yfinance as yf
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+from algotrade.price_store import load_history
+from algotrade.metrics import cagr
+from algotrade.shared_cache import memoize
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+from algotrade.universe import STOCK_INDICES
+from algotrade.warmup import start_background_warmup
+
 # Page configurations
 st.set_page_config(
     page_title="Future Value Calculator",
     page_icon="📈",
     layout="centered"
 )
+begin_rerun("inflation")
+start_background_warmup()
 
 # Fun explanation for kids
 st.markdown("""
@@ -101,34 +110,42 @@ amount = st.selectbox(
     format_func=lambda x: f"${x:,}"
 )
 
-# Stock market indices with their tickers and average returns
-STOCK_INDICES = {
-    "S&P 500 (SPY)": "SPY",
-    "NASDAQ-100 (QQQ)": "QQQ",
-    "Dow Jones (DIA)": "DIA",
-    "MSCI World (URTH)": "URTH",
-    "S&P 500 Growth (IVW)": "IVW"
-}
-
 # Default values
 DEFAULT_INFLATION = 3.0  # 3% annual inflation
 DEFAULT_YEARS = 5
 DEFAULT_AMOUNT = 1000
 
-# Function to get historical performance of an index
+# Function to get historical performance of an index (None if it can't be fetched,
+# which memoize doesn't cache, so a failed download is retried on the next rerun)
+@memoize('index_performance', ttl=86400)
 def get_index_performance(ticker, years=5):
     try:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=365*years)
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
+        df = load_history(ticker, start_date.date(), end_date.date())
         if not df.empty and len(df) > 1:  # Ensure we have enough data points
-            start_price = float(df['Close'].iloc[0])
-            end_price = float(df['Close'].iloc[-1])
-            if start_price > 0:  # Avoid division by zero
-                return float(((end_price / start_price) ** (1/years) - 1) * 100)
+            annual_return = cagr(df['Close'].to_numpy(dtype=float), years)
+            if annual_return is not None:
+                return annual_return
     except Exception as e:
         print(f"Error getting performance for {ticker}: {e}")
-    return 7.0  # Default return if data fetch fails
+    return None
+
+# Cached results are read on this thread; only the misses are downloaded, all at
+# once, so the page waits for the slowest download instead of the sum. Each result
+# is shared by every session and worker process for a day
+def get_index_performances(tickers, years=5):
+    returns = {}
+    for ticker in tickers:
+        found, value = get_index_performance.lookup(ticker, years)
+        if found:
+            returns[ticker] = value
+    missing = [ticker for ticker in tickers if ticker not in returns]
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            returns.update(zip(missing, pool.map(lambda ticker: get_index_performance.refresh(ticker, years),
+                                                 missing)))
+    return {ticker: returns[ticker] for ticker in tickers}
 
 # Time horizon
 st.subheader("3. Time period")
@@ -147,7 +164,8 @@ def calculate_items(amount, price, years, inflation_rate):
     }
 
 # Calculate
-results = calculate_items(amount, item["price"], years, DEFAULT_INFLATION)
+with span("compute.inflation"):
+    results = calculate_items(amount, item["price"], years, DEFAULT_INFLATION)
 
 # Inflation comparison row
 st.markdown("### 📊 Inflation Impact")
@@ -199,9 +217,11 @@ st.markdown("""
 
 # Calculate performance for each index
 index_performance = {}
+with span("fetch.index_performance"):
+    ticker_returns = get_index_performances(tuple(STOCK_INDICES.values()), years=5)
 for name, ticker in STOCK_INDICES.items():
-    return_rate = get_index_performance(ticker, years=5)
-    # Ensure we have a numeric value
+    return_rate = ticker_returns.get(ticker)
+    # Default return if the data fetch failed
     index_performance[name] = float(return_rate) if return_rate is not None else 7.0
 
 # Sort by performance (convert to list of tuples first)
@@ -233,6 +253,7 @@ investment_value = amount * ((1 + (selected_return/100)) ** years)
 items_with_investment = investment_value / results['future_price']
 
 # Display investment comparison
+html_span = start_span("render.html")
 st.markdown("""
 <div style='margin: 30px 0; padding: 20px; border-radius: 12px; background-color: #f1f8e9; border: 2px solid #a5d6a7; box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
     <h3 style='margin: 0 0 15px 0; color: #1b5e20; border-bottom: 2px dashed #81c784; padding-bottom: 10px;'>💰 Investment Potential</h3>
@@ -265,4 +286,7 @@ st.markdown("""
     int(round(items_with_investment)), results['item_name'],
     int(round(results['items_now'])),
     round(selected_return, 1)
-), unsafe_allow_html=True)
\ No newline at end of file
+), unsafe_allow_html=True)
+html_span.end()
+
+finish_rerun()
@@ -1,11 +1,24 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
 import requests
 
+from algotrade.price_store import load_history
+from algotrade.providers import get_provider
+from algotrade.intraday import bars_per_year, load_bars
+from algotrade.shared_cache import get_shared_cache, memoize
+from algotrade.backtest import align_closes, rank_assets, simulate_plan
+from algotrade.analysis import calculate_returns, day_clock
+from algotrade.incremental import extend_stats
+from algotrade.strategies import STRATEGIES, signal_backtest
+from algotrade.optimizer import sma_sweep, sweep_heatmap
+from algotrade.charts import line_trace
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+from algotrade.universe import BENCHMARK_TICKER, STOCK_CATEGORIES
+from algotrade.warmup import start_background_warmup
+
 # Page configuration
 st.set_page_config(
     page_title="Investment Backtesting Tool",
@@ -13,6 +26,18 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+begin_rerun("investment_backtesting_tool")
+start_background_warmup()
+
+# Bar sizes offered in the sidebar (label -> provider interval)
+BAR_SIZES = {
+    "1 Day": "1d",
+    "1 Hour": "1h",
+    "30 Minutes": "30m",
+    "15 Minutes": "15m",
+    "5 Minutes": "5m",
+    "1 Minute": "1m"
+}
 
 # Custom CSS for professional styling
 st.markdown("""
@@ -112,74 +137,21 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Expanded stock selection with categories including more crypto
-STOCK_CATEGORIES = {
-    'Technology': {
-        'Apple Inc.': 'AAPL',
-        'Microsoft Corporation': 'MSFT',
-        'Alphabet Inc.': 'GOOGL',
-        'Amazon.com Inc.': 'AMZN',
-        'Meta Platforms Inc.': 'META',
-        'Netflix Inc.': 'NFLX',
-        'Adobe Inc.': 'ADBE',
-        'Salesforce Inc.': 'CRM',
-        'NVIDIA Corporation': 'NVDA',
-        'Intel Corporation': 'INTC'
-    },
-    'Consumer & Retail': {
-        'Tesla Inc.': 'TSLA',
-        'The Walt Disney Company': 'DIS',
-        'McDonald\'s Corporation': 'MCD',
-        'Nike Inc.': 'NKE',
-        'The Coca-Cola Company': 'KO',
-        'Starbucks Corporation': 'SBUX',
-        'The Home Depot Inc.': 'HD',
-        'Walmart Inc.': 'WMT',
-        'Procter & Gamble Co.': 'PG',
-        'Johnson & Johnson': 'JNJ'
-    },
-    'Financial Services': {
-        'Berkshire Hathaway Inc.': 'BRK-B',
-        'JPMorgan Chase & Co.': 'JPM',
-        'Bank of America Corp.': 'BAC',
-        'Wells Fargo & Company': 'WFC',
-        'The Goldman Sachs Group': 'GS',
-        'American Express Company': 'AXP',
-        'PayPal Holdings Inc.': 'PYPL',
-        'Visa Inc.': 'V',
-        'Mastercard Incorporated': 'MA'
-    },
-    'Cryptocurrency (Direct & ETFs)': {
-        'Bitcoin USD': 'BTC-USD',
-        'Ethereum USD': 'ETH-USD',
-        'Cardano USD': 'ADA-USD',
-        'Solana USD': 'SOL-USD',
-        'Dogecoin USD': 'DOGE-USD',
-        'ProShares Bitcoin Strategy ETF': 'BITO',
-        'Grayscale Bitcoin Trust': 'GBTC',
-        'Grayscale Ethereum Trust': 'ETHE',
-        'Coinbase Global Inc.': 'COIN'
-    }
-}
-
 # Function to get Bitcoin data with fallback
-@st.cache_data(ttl=3600)
-def get_crypto_data(symbol, start_date, end_date):
+def get_crypto_data(symbol, start_date, end_date, interval='1d'):
     """Get crypto data with multiple fallback options"""
     try:
         # Try Yahoo Finance first
         if symbol.endswith('-USD'):
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(start=start_date, end=end_date, period="max")
-            if not data.empty:
+            data = load_bars(symbol, start_date, end_date, interval)
+            if data is not None and not data.empty:
                 return data, "Yahoo Finance"
         
         # If Yahoo Finance fails or data is empty, try alternative approach
         if symbol == 'BTC-USD':
             # Try GBTC as a proxy for Bitcoin
-            ticker = yf.Ticker('GBTC')
-            data = ticker.history(start=start_date, end=end_date, period="max")
-            if not data.empty:
+            data = load_bars('GBTC', start_date, end_date, interval)
+            if data is not None and not data.empty:
                 st.warning("⚠️ Using Grayscale Bitcoin Trust (GBTC) as Bitcoin proxy")
                 return data, "GBTC (Bitcoin Proxy)"
         
@@ -239,6 +211,39 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Recurring contributions and rebalancing
+    st.markdown('<div class="sidebar-header">Investment Plan</div>', unsafe_allow_html=True)
+    recurring_amount = st.number_input(
+        "Recurring contribution (USD):",
+        min_value=0,
+        max_value=10000,
+        value=0,
+        step=50,
+        help="Money added on the first trading day of every period. Leave at 0 for a single lump-sum purchase."
+    )
+    contribution_frequency = st.selectbox("Contribution frequency:", ["Monthly", "Quarterly"])
+    rebalance_choice = st.selectbox("Rebalance sector portfolio:", ["Never", "Monthly", "Quarterly"])
+    rebalance_frequency = None if rebalance_choice == "Never" else rebalance_choice
+    
+    st.markdown("---")
+    
+    # Rule-based trading strategy tested on the same prices
+    st.markdown('<div class="sidebar-header">Trading Strategy</div>', unsafe_allow_html=True)
+    strategy_name = st.selectbox("Strategy:", ["Buy and Hold"] + list(STRATEGIES.keys()))
+    strategy_params = {}
+    if strategy_name != "Buy and Hold":
+        for param, default in STRATEGIES[strategy_name][1].items():
+            if isinstance(default, float):
+                strategy_params[param] = st.number_input(f"{param.title()}:", min_value=0.5, max_value=5.0,
+                                                         value=default, step=0.5, key=f"param_{param}")
+            else:
+                strategy_params[param] = int(st.number_input(f"{param.title()}:", min_value=2, max_value=300,
+                                                             value=default, step=1, key=f"param_{param}"))
+        cost_bps = st.number_input("Trading cost (basis points per trade):", min_value=0.0, max_value=100.0,
+                                   value=5.0, step=1.0)
+    
+    st.markdown("---")
+    
     # Date selection with presets
     st.markdown('<div class="sidebar-header">Investment Period</div>', unsafe_allow_html=True)
     
@@ -280,25 +285,38 @@ with st.sidebar:
         max_value=datetime.now().date()
     )
     
+    bar_size = st.selectbox(
+        "Bar size:",
+        list(BAR_SIZES.keys()),
+        help="Intraday bars only reach back a limited time: 1 minute about a week, "
+             "5 to 30 minutes about 60 days, 1 hour about 2 years."
+    )
+    interval = BAR_SIZES[bar_size]
+    
     st.markdown("---")
     calculate_button = st.button("Calculate Returns", type="primary", use_container_width=True)
+    compare_button = st.button("Compare Entire Sector", use_container_width=True)
+    
+    with st.expander("SMA Strategy Optimizer"):
+        sweep_all_sectors = st.checkbox("Every sector (not just the selected one)")
+        sweep_step = st.slider("Window step (days):", 1, 20, 5,
+                               help="Fast and slow averages from 5 to 200 days in this step. 1 tests every pair.")
+        optimize_button = st.button("Optimize SMA Crossover", use_container_width=True)
 
-# Enhanced cache function for better performance
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def get_stock_data(ticker, start, end):
+# Prices are sliced from the stored full history, so warnings below are shown on every run
+def get_stock_data(ticker, start, end, interval='1d'):
     """Fetch stock data with error handling and crypto support"""
     try:
         # Handle cryptocurrency tickers specially
         if ticker.endswith('-USD') or ticker in ['BTC-USD', 'ETH-USD', 'ADA-USD', 'SOL-USD', 'DOGE-USD']:
-            data, source = get_crypto_data(ticker, start, end)
+            data, source = get_crypto_data(ticker, start, end, interval)
             if data is not None:
                 return data, source
         
-        # Regular stock data
-        stock = yf.Ticker(ticker)
-        data = stock.history(start=start, end=end, period="max")
+        # Regular stock data (intraday bars are resampled from the finest interval already stored)
+        data = load_bars(ticker, start, end, interval)
         
-        if data.empty:
+        if data is None or data.empty:
             st.error(f"No data available for {ticker} in the selected period.")
             return None, None
         
@@ -315,42 +333,40 @@ def get_stock_data(ticker, start, end):
         st.error(f"Error fetching data for {ticker}: {str(e)}")
         return None, None
 
-def calculate_returns(data, investment_amount):
-    """Calculate investment returns with additional metrics"""
-    if data is None or len(data) == 0:
+@memoize('sector', ttl=3600)
+def get_sector_data(tickers, start, end):
+    """Fetch every ticker of a sector, skipping the ones without data (None if none had any)"""
+    frames = {}
+    for symbol in tickers:
+        try:
+            data = load_history(symbol, start, end)
+            if data is not None and not data.empty:
+                frames[symbol] = data[['Close']]
+        except Exception:
+            continue
+    # None is not cached, so a failed download is retried on the next rerun
+    return frames or None
+
+def running_stats(data, ticker, data_source, interval, start):
+    """This session's running statistics for one (ticker, start), extended to ``data``.
+
+    Moving the end date forward only folds in the new bars; any other change
+    starts over.
+    """
+    key = (get_provider().name, ticker, data_source, interval, start)
+    saved = st.session_state.get('returns_stats')
+    stats = saved[1] if saved is not None and saved[0] == key else None
+    stats = extend_stats(stats, data['Close'].to_numpy(dtype=float), day_clock(data.index))
+    st.session_state.returns_stats = (key, stats)
+    return stats
+
+def get_benchmark_data(start, end):
+    """S&P 500 ETF prices used for beta and correlation"""
+    try:
+        data = load_history(BENCHMARK_TICKER, start, end)
+        return data['Close'] if data is not None and not data.empty else None
+    except Exception:
         return None
-    
-    start_price = data['Close'].iloc[0]
-    end_price = data['Close'].iloc[-1]
-    shares_bought = investment_amount / start_price
-    final_value = shares_bought * end_price
-    total_return = final_value - investment_amount
-    return_percentage = (total_return / investment_amount) * 100
-    
-    # Additional metrics
-    max_price = data['Close'].max()
-    min_price = data['Close'].min()
-    max_value = shares_bought * max_price
-    min_value = shares_bought * min_price
-    
-    # Volatility (standard deviation of daily returns)
-    daily_returns = data['Close'].pct_change().dropna()
-    volatility = daily_returns.std() * np.sqrt(252) * 100  # Annualized volatility
-    
-    return {
-        'start_price': start_price,
-        'end_price': end_price,
-        'shares_bought': shares_bought,
-        'final_value': final_value,
-        'total_return': total_return,
-        'return_percentage': return_percentage,
-        'max_value': max_value,
-        'min_value': min_value,
-        'max_price': max_price,
-        'min_price': min_price,
-        'volatility': volatility,
-        'days_held': len(data)
-    }
 
 # Main calculation logic
 if calculate_button:
@@ -358,11 +374,24 @@ if calculate_button:
         st.error("Start date must be before end date.")
     else:
         with st.spinner("Analyzing investment performance..."):
-            stock_data, data_source = get_stock_data(ticker, start_date, end_date)
+            with span("fetch.prices"):
+                stock_data, data_source = get_stock_data(ticker, start_date, end_date, interval)
             
             if stock_data is not None and len(stock_data) > 0:
-                results = calculate_returns(stock_data, investment_amount)
-                
+                with span("fetch.benchmark"):
+                    benchmark_data = get_benchmark_data(start_date, end_date)
+                periods_per_year = bars_per_year(interval, around_the_clock=ticker.endswith('-USD'))
+                with span("compute.returns"):
+                    results = get_shared_cache().get_or_set(
+                        f"returns:{get_provider().name}:{ticker}:{data_source}:{interval}:"
+                        f"{start_date}:{end_date}:{investment_amount}",
+                        lambda: calculate_returns(stock_data, investment_amount, benchmark_data,
+                                                  periods_per_year=periods_per_year,
+                                                  stats=running_stats(stock_data, ticker, data_source,
+                                                                      interval, start_date)),
+                        ttl=3600, name='returns'
+                    )
+
                 if results:
                     # Show data source
                     if data_source:
@@ -423,14 +452,15 @@ if calculate_button:
                     # Interactive chart
                     st.markdown('<h2 class="section-header">Price Performance Chart</h2>', unsafe_allow_html=True)
                     
+                    figure_span = start_span("figure.build")
                     fig = go.Figure()
                     
                     # Main price line with different colors for crypto
                     line_color = '#f39c12' if category == 'Cryptocurrency (Direct & ETFs)' else '#3498db'
                     
-                    fig.add_trace(go.Scatter(
-                        x=stock_data.index,
-                        y=stock_data['Close'],
+                    fig.add_trace(line_trace(
+                        stock_data.index,
+                        stock_data['Close'],
                         mode='lines',
                         name=f'{selected_company}',
                         line=dict(color=line_color, width=2.5),
@@ -494,7 +524,66 @@ if calculate_button:
                         showlegend=True
                     )
                     
-                    st.plotly_chart(fig, use_container_width=True)
+                    figure_span.end()
+                    with span("render.chart"):
+                        st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Recurring contributions (dollar-cost averaging)
+                    if recurring_amount > 0:
+                        st.markdown('<h2 class="section-header">Recurring Investment Plan</h2>', unsafe_allow_html=True)
+                        plan_span = start_span("compute.plan")
+                        plan = simulate_plan(
+                            stock_data[['Close']].to_numpy(dtype=float),
+                            [1.0],
+                            stock_data.index,
+                            investment_amount,
+                            contribution=recurring_amount,
+                            contribution_frequency=contribution_frequency,
+                            periods_per_year=periods_per_year
+                        )
+                        plan_span.end()
+                        
+                        col1, col2, col3, col4 = st.columns(4)
+                        with col1:
+                            st.metric("Total Invested", f"${plan['total_invested']:,.2f}")
+                        with col2:
+                            st.metric("Final Value", f"${plan['final_value']:,.2f}",
+                                    delta=f"${plan['profit']:,.2f}")
+                        with col3:
+                            st.metric("Return on Invested", f"{plan['return_percentage']:.2f}%")
+                        with col4:
+                            st.metric(f"{contribution_frequency} Contributions", f"{plan['contributions']}")
+                        
+                        figure_span = start_span("figure.build")
+                        fig_plan = go.Figure()
+                        fig_plan.add_trace(line_trace(
+                            plan['dates'],
+                            plan['values'],
+                            mode='lines',
+                            name='Portfolio Value',
+                            line=dict(color=line_color, width=2.5),
+                            hovertemplate='<b>Value</b>: $%{y:,.2f}<extra></extra>'
+                        ))
+                        fig_plan.add_trace(line_trace(
+                            plan['dates'],
+                            plan['invested'],
+                            mode='lines',
+                            name='Money Invested',
+                            line=dict(color='#7f8c8d', width=2, shape='hv'),
+                            hovertemplate='<b>Invested</b>: $%{y:,.2f}<extra></extra>'
+                        ))
+                        fig_plan.update_layout(
+                            title=f"${investment_amount:,.0f} up front plus ${recurring_amount:,.0f} {contribution_frequency.lower()}",
+                            xaxis_title="Date",
+                            yaxis_title="Value (USD)",
+                            template='plotly_white',
+                            hovermode='x unified',
+                            height=450,
+                            showlegend=True
+                        )
+                        figure_span.end()
+                        with span("render.chart"):
+                            st.plotly_chart(fig_plan, use_container_width=True)
                     
                     # Performance analysis with crypto-specific insights
                     st.markdown('<h2 class="section-header">Detailed Analysis</h2>', unsafe_allow_html=True)
@@ -533,7 +622,14 @@ if calculate_button:
                             else:
                                 risk_level, risk_color = "High", "#e74c3c"
                         
-                        max_drawdown = ((results['min_value'] - results['max_value']) / results['max_value'] * 100) if results['max_value'] > 0 else 0
+                        drawdown = results['drawdown']
+                        max_drawdown = drawdown['max_drawdown']
+                        if drawdown['peak_date'] is None:
+                            drawdown_text = "No drawdown in this period"
+                        elif drawdown['recovery_date'] is not None:
+                            drawdown_text = f"Recovered on {drawdown['recovery_date'].strftime('%b %d, %Y')} ({drawdown['underwater_days']} days under water)"
+                        else:
+                            drawdown_text = f"Not yet recovered ({drawdown['underwater_days']} days under water)"
                         price_range_pct = ((results['max_price'] - results['min_price']) / results['min_price'] * 100) if results['min_price'] > 0 else 0
                         
                         box_style = "crypto-box" if category == 'Cryptocurrency (Direct & ETFs)' else "info-box"
@@ -544,8 +640,350 @@ if calculate_button:
                             <p><strong>Risk Category:</strong> <span style="color: {risk_color}; font-weight: bold;">{risk_level}</span></p>
                             <p><strong>Price Range:</strong> ${results['min_price']:.2f} - ${results['max_price']:.2f} ({price_range_pct:.1f}%)</p>
                             <p><strong>Maximum Drawdown:</strong> {max_drawdown:.1f}%</p>
+                            <p><strong>Drawdown Recovery:</strong> {drawdown_text}</p>
                         </div>
                         """, unsafe_allow_html=True)
+                    
+                    # Underwater curve: how far below its previous high the investment was each day
+                    drawdown = results['drawdown']
+                    st.markdown('<h2 class="section-header">Drawdown (Underwater) Chart</h2>', unsafe_allow_html=True)
+                    
+                    figure_span = start_span("figure.build")
+                    fig_dd = go.Figure()
+                    fig_dd.add_trace(line_trace(
+                        stock_data.index,
+                        drawdown['underwater'] * 100,
+                        mode='lines',
+                        name='Drawdown',
+                        fill='tozeroy',
+                        line=dict(color='#e74c3c', width=1.5),
+                        hovertemplate='<b>Date</b>: %{x}<br><b>Below Peak</b>: %{y:.1f}%<extra></extra>'
+                    ))
+                    if drawdown['trough_date'] is not None:
+                        fig_dd.add_trace(go.Scatter(
+                            x=[drawdown['trough_date']],
+                            y=[drawdown['max_drawdown']],
+                            mode='markers',
+                            name='Maximum Drawdown',
+                            marker=dict(color='#9b59b6', size=10, symbol='diamond'),
+                            hovertemplate='<b>Trough Date</b>: %{x}<br><b>Drawdown</b>: %{y:.1f}%<extra></extra>'
+                        ))
+                    fig_dd.update_layout(
+                        title="Percent below the highest value reached so far",
+                        xaxis_title="Date",
+                        yaxis_title="Drawdown (%)",
+                        template='plotly_white',
+                        hovermode='x unified',
+                        height=350,
+                        showlegend=True
+                    )
+                    figure_span.end()
+                    with span("render.chart"):
+                        st.plotly_chart(fig_dd, use_container_width=True)
+                    
+                    if drawdown['peak_date'] is not None:
+                        st.caption(
+                            f"Worst drop: {abs(drawdown['max_drawdown']):.1f}% from the peak on "
+                            f"{drawdown['peak_date'].strftime('%b %d, %Y')} to the low on "
+                            f"{drawdown['trough_date'].strftime('%b %d, %Y')} ({drawdown['drawdown_days']} days). "
+                            f"Longest time below a previous high: {drawdown['longest_underwater_days']} days."
+                        )
+                    
+                    # Extended risk metrics
+                    metrics = results['metrics']
+                    st.markdown('<h2 class="section-header">Risk & Return Metrics</h2>', unsafe_allow_html=True)
+                    
+                    def show_number(value, fmt):
+                        return "N/A" if value is None or np.isnan(value) else fmt.format(value)
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("CAGR", show_number(metrics['cagr'], "{:.2f}%"),
+                                help="Compound annual growth rate: the steady yearly return that gives the same result")
+                    with col2:
+                        st.metric("Sharpe Ratio", show_number(metrics['sharpe'], "{:.2f}"),
+                                help="Return per unit of total volatility (higher is better)")
+                    with col3:
+                        st.metric("Sortino Ratio", show_number(metrics['sortino'], "{:.2f}"),
+                                help="Like Sharpe, but only counts downside swings as risk")
+                    with col4:
+                        st.metric("Calmar Ratio", show_number(metrics['calmar'], "{:.2f}"),
+                                help="CAGR divided by the maximum drawdown")
+                    
+                    col5, col6, col7, col8 = st.columns(4)
+                    with col5:
+                        st.metric("Daily VaR (95%)", show_number(metrics['var'], "{:.2f}%"),
+                                help="On 95% of days the loss was smaller than this")
+                    with col6:
+                        st.metric("Daily CVaR (95%)", show_number(metrics['cvar'], "{:.2f}%"),
+                                help="Average loss on the worst 5% of days")
+                    with col7:
+                        st.metric(f"Beta vs {BENCHMARK_TICKER}", show_number(metrics['beta'], "{:.2f}"),
+                                help="How much the asset moved when the S&P 500 moved 1%")
+                    with col8:
+                        st.metric(f"Correlation vs {BENCHMARK_TICKER}", show_number(metrics['correlation'], "{:.2f}"))
+                    
+                    figure_span = start_span("figure.build")
+                    fig_risk = go.Figure()
+                    fig_risk.add_trace(line_trace(
+                        stock_data.index[1:],
+                        metrics['rolling_volatility'],
+                        mode='lines',
+                        name='Rolling Volatility (1 month)',
+                        line=dict(color=line_color, width=2),
+                        hovertemplate='<b>Volatility</b>: %{y:.1f}%<extra></extra>'
+                    ))
+                    if metrics['rolling_correlation'] is not None:
+                        fig_risk.add_trace(line_trace(
+                            metrics['correlation_dates'],
+                            metrics['rolling_correlation'],
+                            mode='lines',
+                            name=f'Rolling Correlation vs {BENCHMARK_TICKER} (3 months)',
+                            line=dict(color='#2c3e50', width=1.5),
+                            yaxis='y2',
+                            hovertemplate='<b>Correlation</b>: %{y:.2f}<extra></extra>'
+                        ))
+                    fig_risk.update_layout(
+                        title="Rolling Risk",
+                        xaxis_title="Date",
+                        yaxis=dict(title="Annualized Volatility (%)"),
+                        yaxis2=dict(title="Correlation", overlaying='y', side='right', range=[-1, 1]),
+                        template='plotly_white',
+                        hovermode='x unified',
+                        height=400,
+                        showlegend=True
+                    )
+                    figure_span.end()
+                    with span("render.chart"):
+                        st.plotly_chart(fig_risk, use_container_width=True)
+                    
+                    # Rule-based strategy on the same Close prices
+                    if strategy_name != "Buy and Hold":
+                        st.markdown(f'<h2 class="section-header">Strategy Backtest: {strategy_name}</h2>', unsafe_allow_html=True)
+                        close = stock_data['Close'].to_numpy(dtype=float)
+                        with span("compute.strategy"):
+                            entries, exits = STRATEGIES[strategy_name][0](close, **strategy_params)
+                            strategy = signal_backtest(close, entries, exits, investment_amount,
+                                                       cost_bps=cost_bps, periods_per_year=periods_per_year)
+                        
+                        col1, col2, col3, col4 = st.columns(4)
+                        with col1:
+                            st.metric("Strategy Value", f"${strategy['final_value']:,.2f}",
+                                      f"{strategy['return_percentage']:+.2f}%")
+                        with col2:
+                            st.metric("Buy and Hold", f"{strategy['buy_and_hold_percentage']:+.2f}%")
+                        with col3:
+                            st.metric("Trades / Win Rate", f"{strategy['trades']} / {strategy['win_rate']:.0f}%")
+                        with col4:
+                            st.metric("Max Drawdown", f"{strategy['max_drawdown']:.2f}%",
+                                      f"{strategy['exposure']:.0f}% of the time invested", delta_color="off")
+                        
+                        figure_span = start_span("figure.build")
+                        fig_strategy = go.Figure()
+                        fig_strategy.add_trace(line_trace(
+                            stock_data.index,
+                            strategy['equity'],
+                            mode='lines',
+                            name=strategy_name,
+                            line=dict(color=line_color, width=2.5),
+                            hovertemplate='<b>Strategy</b>: $%{y:,.2f}<extra></extra>'
+                        ))
+                        fig_strategy.add_trace(line_trace(
+                            stock_data.index,
+                            strategy['buy_and_hold'],
+                            mode='lines',
+                            name='Buy and Hold',
+                            line=dict(color='#7f8c8d', width=2, dash='dash'),
+                            hovertemplate='<b>Buy and Hold</b>: $%{y:,.2f}<extra></extra>'
+                        ))
+                        fig_strategy.add_trace(go.Scatter(
+                            x=stock_data.index[strategy['buys']],
+                            y=strategy['equity'][strategy['buys']],
+                            mode='markers',
+                            name='Buy',
+                            marker=dict(color='#27ae60', size=9, symbol='triangle-up')
+                        ))
+                        fig_strategy.add_trace(go.Scatter(
+                            x=stock_data.index[strategy['sells']],
+                            y=strategy['equity'][strategy['sells']],
+                            mode='markers',
+                            name='Sell',
+                            marker=dict(color='#e74c3c', size=9, symbol='triangle-down')
+                        ))
+                        fig_strategy.update_layout(
+                            title=f"{strategy_name} vs Buy and Hold",
+                            xaxis_title="Date",
+                            yaxis_title="Value (USD)",
+                            template='plotly_white',
+                            hovermode='x unified',
+                            height=450,
+                            showlegend=True
+                        )
+                        figure_span.end()
+                        with span("render.chart"):
+                            st.plotly_chart(fig_strategy, use_container_width=True)
+
+# Sector comparison: every asset of the selected sector ranked in one pass
+if compare_button:
+    if start_date >= end_date:
+        st.error("Start date must be before end date.")
+    else:
+        with st.spinner(f"Comparing all {category} assets..."):
+            sector = STOCK_CATEGORIES[category]
+            with span("fetch.sector"):
+                frames = get_sector_data(tuple(sector.values()), start_date, end_date) or {}
+            with span("compute.align"):
+                dates, symbols, prices, observed = align_closes(frames)
+
+        if not symbols:
+            st.error(f"No data available for the {category} sector in the selected period.")
+        else:
+            names = {symbol: name for name, symbol in sector.items()}
+            with span("compute.rank"):
+                ranking = rank_assets(prices, symbols, observed, amount=investment_amount)
+            ranking.insert(0, 'Asset', ranking['Symbol'].map(names))
+
+            st.markdown(f'<h2 class="section-header">{category}: Sector Ranking</h2>', unsafe_allow_html=True)
+            st.dataframe(
+                ranking.style.format({
+                    'Start Price': '${:,.2f}',
+                    'End Price': '${:,.2f}',
+                    'Final Value': '${:,.2f}',
+                    'Total Return %': '{:.2f}%',
+                    'Volatility %': '{:.1f}%',
+                    'Max Drawdown %': '{:.1f}%',
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+            # Growth of the same investment in every asset, plus an equal-weight basket
+            plan_span = start_span("compute.plan")
+            basket = simulate_plan(
+                prices,
+                np.ones(len(symbols)),
+                dates,
+                investment_amount,
+                contribution=recurring_amount,
+                contribution_frequency=contribution_frequency,
+                rebalance_frequency=rebalance_frequency
+            )
+            plan_span.end()
+            first_rows = np.argmax(~np.isnan(prices), axis=0)
+            growth = investment_amount * prices / prices[first_rows, np.arange(len(symbols))]
+
+            figure_span = start_span("figure.build")
+            fig = go.Figure()
+            for column, symbol in enumerate(symbols):
+                fig.add_trace(line_trace(
+                    dates,
+                    growth[:, column],
+                    mode='lines',
+                    name=names.get(symbol, symbol),
+                    line=dict(width=1.5),
+                    hovertemplate='<b>%{fullData.name}</b>: $%{y:,.2f}<extra></extra>'
+                ))
+            fig.add_trace(line_trace(
+                basket['dates'],
+                basket['values'],
+                mode='lines',
+                name='Equal-Weight Portfolio',
+                line=dict(color='#2c3e50', width=3, dash='dash'),
+                hovertemplate='<b>Equal-Weight Portfolio</b>: $%{y:,.2f}<extra></extra>'
+            ))
+            fig.update_layout(
+                title=f"Growth of ${investment_amount:,.0f} in each {category} asset",
+                xaxis_title="Date",
+                yaxis_title="Value (USD)",
+                template='plotly_white',
+                hovermode='x unified',
+                height=550,
+                showlegend=True
+            )
+            figure_span.end()
+            with span("render.chart"):
+                st.plotly_chart(fig, use_container_width=True)
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Equal-Weight Final Value", f"${basket['final_value']:,.2f}",
+                          delta=f"{basket['return_percentage']:.2f}%")
+            with col2:
+                st.metric("Total Invested", f"${basket['total_invested']:,.2f}")
+            with col3:
+                st.metric("Portfolio Volatility", f"{basket['volatility']:.1f}%")
+            with col4:
+                st.metric("Portfolio Max Drawdown", f"{basket['max_drawdown']:.1f}%")
+            
+            if rebalance_frequency:
+                st.caption(f"The portfolio was rebalanced back to equal weights {basket['rebalances']} times ({rebalance_choice.lower()}).")
+
+# Parameter sweep: every fast/slow SMA pair on every ticker, spread over the optimizer's worker pool.
+# Only the ranked summary is cached, not the table of every backtest.
+@memoize('sma_sweep', ttl=3600)
+def get_sma_sweep(tickers, start, end, step, cost):
+    frames = get_sector_data(tickers, start, end) or {}
+    dates, symbols, prices, observed = align_closes(frames)
+    if not symbols:
+        return None
+    # Each asset runs on its own bars and calendar: crypto trades every day, stocks don't
+    periods = [bars_per_year('1d', around_the_clock=symbol.endswith('-USD')) for symbol in symbols]
+    table = sma_sweep(prices, symbols, observed, windows=range(5, 201, step), cost_bps=cost,
+                      periods_per_year=periods)
+    if table.empty:
+        return None
+    return {'best': table.head(20), 'heatmap': sweep_heatmap(table), 'runs': len(table)}
+
+if optimize_button:
+    if start_date >= end_date:
+        st.error("Start date must be before end date.")
+    else:
+        if sweep_all_sectors:
+            sweep_names = {symbol: name for sector in STOCK_CATEGORIES.values() for name, symbol in sector.items()}
+        else:
+            sweep_names = {symbol: name for name, symbol in STOCK_CATEGORIES[category].items()}
+        sweep_cost = cost_bps if strategy_name != "Buy and Hold" else 5.0
+        with st.spinner(f"Testing SMA pairs on {len(sweep_names)} assets..."):
+            with span("compute.sma_sweep"):
+                sweep = get_sma_sweep(tuple(sweep_names), start_date, end_date, sweep_step, sweep_cost)
+        
+        if sweep is None:
+            st.error("Not enough price data to run the optimizer for this period.")
+        else:
+            st.markdown('<h2 class="section-header">SMA Crossover Optimizer</h2>', unsafe_allow_html=True)
+            st.caption(f"{sweep['runs']:,} backtests with a {sweep_cost:.0f} basis point cost per trade, best Sharpe ratio first.")
+            best = sweep['best'].copy()
+            best.insert(1, 'Asset', best['Symbol'].map(sweep_names))
+            st.dataframe(
+                best.style.format({
+                    'Return %': '{:+.1f}%',
+                    'Sharpe': '{:.2f}',
+                    'Max Drawdown %': '{:.1f}%'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            grid = sweep['heatmap']
+            figure_span = start_span("figure.build")
+            fig_sweep = go.Figure(go.Heatmap(
+                z=grid.to_numpy(),
+                x=grid.columns,
+                y=grid.index,
+                colorscale='RdYlGn',
+                colorbar=dict(title="Sharpe"),
+                hovertemplate='<b>Fast</b>: %{x}<br><b>Slow</b>: %{y}<br><b>Median Sharpe</b>: %{z:.2f}<extra></extra>'
+            ))
+            fig_sweep.update_layout(
+                title="Median Sharpe ratio across assets for each SMA pair",
+                xaxis_title="Fast SMA (days)",
+                yaxis_title="Slow SMA (days)",
+                template='plotly_white',
+                height=550
+            )
+            figure_span.end()
+            with span("render.chart"):
+                st.plotly_chart(fig_sweep, use_container_width=True)
 
 # Information section with crypto details
 st.markdown('<h2 class="section-header">How This Tool Works</h2>', unsafe_allow_html=True)
@@ -599,3 +1037,5 @@ st.markdown("""
     <p>Market data provided by Yahoo Finance | Cryptocurrency data included</p>
 </div>
 """, unsafe_allow_html=True)
+
+finish_rerun()
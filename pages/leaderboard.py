@@ -0,0 +1,96 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from datetime import datetime
+
+from algotrade.persistence import DEFAULT_CLASSROOM, get_portfolio_db
+from algotrade.portfolio import fully_priced, holdings_matrix, value_portfolios
+from algotrade.quotes import get_quotes
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+
+st.set_page_config(page_title="Classroom Leaderboard", page_icon="🏆", layout="centered")
+begin_rerun("leaderboard")
+
+st.title("🏆 Classroom Leaderboard")
+st.write("Who has grown their pretend money the most? Save your portfolio on the trader page to join!")
+
+# -------------------- Load every saved portfolio --------------------
+db = get_portfolio_db()
+with span("store.load_classroom"):
+    portfolios, holdings = db.all_holdings()
+
+if not portfolios:
+    st.info("No saved portfolios yet. Type your name on the trader page to save yours.")
+else:
+    ids = [row[0] for row in portfolios]
+    students = [row[1] for row in portfolios]
+    cash = [row[2] for row in portfolios]
+    starting_cash = np.array([row[3] for row in portfolios])
+
+    # Each held symbol is quoted exactly once, however many students own it
+    symbols = holdings_matrix(ids, holdings)[0]
+    try:
+        with span("fetch.quotes"):
+            prices = get_quotes(symbols)
+    except Exception:
+        prices = {}
+
+    with span("compute.valuation"):
+        values = value_portfolios(ids, cash, holdings, prices)
+        returns = (values / starting_cash - 1) * 100
+        order = np.argsort(-values, kind='stable')
+
+    # Today's snapshot is written once per portfolio, and only when every holding had a price:
+    # a failed quote would otherwise store the holding at $0
+    today = datetime.now().strftime("%Y-%m-%d")
+    with span("store.snapshot"):
+        todo = db.missing_snapshots(today)
+        if todo:
+            complete = fully_priced(ids, holdings, prices)
+            rows = [(pid, today, round(float(value), 2))
+                    for pid, value, ok in zip(ids, values, complete) if ok and pid in todo]
+            if rows:
+                db.record_snapshots(rows)
+
+    board = pd.DataFrame({
+        "Rank": np.arange(1, len(order) + 1),
+        "Student": np.array(students)[order],
+        "Value": [f"${v:,.2f}" for v in values[order]],
+        "Return": [f"{r:+.1f}%" for r in returns[order]],
+    })
+    with span("render.table"):
+        st.dataframe(board, hide_index=True, use_container_width=True)
+
+    missing = [symbol for symbol in symbols if not prices.get(symbol)]
+    if missing:
+        st.caption(f"No price right now for {', '.join(missing)} (counted as $0).")
+
+    top = order[:10]
+    figure_span = start_span("figure.build")
+    fig = go.Figure(go.Bar(
+        x=np.array(students)[top],
+        y=returns[top],
+        marker_color=['#4CAF50' if r >= 0 else '#F44336' for r in returns[top]]
+    ))
+    fig.update_layout(
+        title="Top 10 Returns",
+        xaxis_title="Student",
+        yaxis_title="Return (%)",
+        height=400
+    )
+    figure_span.end()
+    with span("render.chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # -------------------- Who owns a stock? --------------------
+    lookup = st.text_input("Who owns a stock? Enter a symbol:", "").strip().upper()
+    if lookup:
+        with span("store.holders"):
+            owners = db.holders(lookup, DEFAULT_CLASSROOM)
+        if owners:
+            st.dataframe(pd.DataFrame(owners, columns=["Student", "Shares"]), hide_index=True)
+        else:
+            st.write(f"Nobody owns {lookup} yet.")
+
+finish_rerun()
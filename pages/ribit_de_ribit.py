@@ -3,6 +3,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import rcParams
 
+from algotrade.compounding import compound_balance, total_deposits, simulate_scenarios, retirement_grid
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+
 # --- Set up English font and styling ---
 rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.labelweight'] = 'bold'
@@ -10,6 +13,7 @@ plt.rcParams['axes.titleweight'] = 'bold'
 
 # --- Page configuration ---
 st.set_page_config(page_title="Compound Interest Simulator", layout="centered")
+begin_rerun("ribit_de_ribit")
 st.title("💸 Compound Interest: Invest Smart, Earn Big")
 
 st.markdown("""
@@ -18,50 +22,41 @@ With visualizations, comparisons, and a quick quiz, you'll learn why starting ea
 """)
 
 # --- Scenarios ---
+# Everyone stops saving at 60, so the start age is what makes the difference
+RETIREMENT_AGE = 60
+# scenario -> (name, start age, initial amount, monthly contribution)
+SCENARIOS = {
+    "Eyal starts investing at age 20": ("Eyal", 20, 5000, 500),
+    "Bar starts at age 30": ("Bar", 30, 5000, 700),
+    "Gal starts at age 40": ("Gal", 40, 10000, 1000),
+}
+# investment type -> (annual rate %, explanation)
+INVESTMENT_OPTIONS = {
+    "Bank Deposit": (2.0, "🔐 A safe but low-return investment. Ideal for risk-averse individuals."),
+    "Index Fund": (7.0, "📈 Long-term diversified stock investment. Balanced risk and return."),
+    "Crypto": (12.0, "🚀 High potential return with high volatility. Risky but possibly rewarding."),
+}
+
 st.markdown("### 📊 Choose a scenario")
-scenario = st.radio("Select a scenario to visualize:", (
-    "Eyal starts investing at age 20", 
-    "Bar starts at age 30", 
-    "Gal starts at age 40",
-    "Customize your own"
-), index=3)
-
-# All use the same interest rate (Index Fund)
-annual_rate = 7.0
+scenario = st.radio("Select a scenario to visualize:", (*SCENARIOS, "Customize your own"), index=3)
+
+# All scenarios use the same interest rate (Index Fund)
 investment_option = "Index Fund"
+annual_rate = INVESTMENT_OPTIONS[investment_option][0]
 
-if scenario == "Eyal starts investing at age 20":
-    initial_amount = 5000
-    monthly_contribution = 500
-    years = 40
-    info = "Eyal invested ₪5,000 initially and ₪500 per month for 40 years (Total invested: ₪245,000)."
-elif scenario == "Bar starts at age 30":
-    initial_amount = 5000
-    monthly_contribution = 700
-    years = 30
-    info = "Bar invested ₪5,000 initially and ₪700 per month for 30 years (Total invested: ₪259,000)."
-elif scenario == "Gal starts at age 40":
-    initial_amount = 10000
-    monthly_contribution = 1000
-    years = 20
-    info = "Gal invested ₪10,000 initially and ₪1,000 per month for 20 years (Total invested: ₪250,000)."
+if scenario in SCENARIOS:
+    person, start_age, initial_amount, monthly_contribution = SCENARIOS[scenario]
+    years = RETIREMENT_AGE - start_age
+    info = (f"{person} invested ₪{initial_amount:,} initially and ₪{monthly_contribution:,} per month for {years} years "
+            f"(Total invested: ₪{initial_amount + monthly_contribution * years * 12:,}).")
 else:
     st.markdown("---")
     initial_amount = st.slider("💰 Initial investment amount (₪)", 100, 20000, 5000, step=100)
     monthly_contribution = st.slider("📥 Monthly contribution (₪)", 0, 5000, 500, step=100)
     years = st.slider("⏳ How many years will you invest?", 1, 40, 30)
-    investment_option = st.selectbox("📊 Choose your investment type:", ("Bank Deposit", "Index Fund", "Crypto"))
-
-    if investment_option == "Bank Deposit":
-        annual_rate = 2.0
-        explanation = "🔐 A safe but low-return investment. Ideal for risk-averse individuals."
-    elif investment_option == "Index Fund":
-        annual_rate = 7.0
-        explanation = "📈 Long-term diversified stock investment. Balanced risk and return."
-    else:
-        annual_rate = 12.0
-        explanation = "🚀 High potential return with high volatility. Risky but possibly rewarding."
+    investment_option = st.selectbox("📊 Choose your investment type:", tuple(INVESTMENT_OPTIONS))
 
+    annual_rate, explanation = INVESTMENT_OPTIONS[investment_option]
     st.info(explanation)
     info = f"You chose to invest ₪{initial_amount} initially and ₪{monthly_contribution} per month for {years} years (Total invested: ₪{initial_amount + monthly_contribution * years * 12:,})."
 
@@ -71,47 +66,111 @@ st.info("📈 Long-term diversified stock investment. Balanced risk and return."
 
 # --- Compound Interest Calculation ---
 months = years * 12
-monthly_rate = (1 + annual_rate / 100) ** (1 / 12) - 1
-
-balance = []
-cash_no_interest = []
-current = initial_amount
+year_marks = np.arange(years + 1) * 12
 
-for month in range(months + 1):
-    if month > 0:
-        current = current * (1 + monthly_rate) + monthly_contribution
-    balance.append(current)
-    cash_no_interest.append(initial_amount + monthly_contribution * month)
+# Closed-form balance at the end of every year (no month-by-month loop)
+with span("compute.compounding"):
+    balance = compound_balance(initial_amount, monthly_contribution, annual_rate, year_marks)
+    cash_no_interest = total_deposits(initial_amount, monthly_contribution, year_marks)
 
 # --- Chart ---
 st.markdown("### 📈 How your money grows over time")
 
+figure_span = start_span("figure.build")
 fig, ax = plt.subplots()
-ax.plot(range(years + 1), [balance[i * 12] for i in range(years + 1)], label="With Compound Interest")
-ax.plot(range(years + 1), [cash_no_interest[i * 12] for i in range(years + 1)], label="No Interest (just deposits)")
+ax.plot(range(years + 1), balance, label="With Compound Interest")
+ax.plot(range(years + 1), cash_no_interest, label="No Interest (just deposits)")
 ax.set_xlabel("Years", fontsize=12)
 ax.set_ylabel("₪", fontsize=12)
 ax.set_title(f"Growth Over {years} Years", fontsize=14)
 ax.legend(loc='upper left')
 ax.grid(True)
-
-st.pyplot(fig)
+figure_span.end()
+
+with span("render.chart"):
+    st.pyplot(fig)
+plt.close(fig)
+
+# --- Side-by-side comparison ---
+# name, start age, initial, monthly, rate
+COMPARISON = [(*plan, INVESTMENT_OPTIONS["Index Fund"][0]) for plan in SCENARIOS.values()]
+
+if st.checkbox("👥 Compare Eyal, Bar, Gal and your plan on one chart"):
+    plans = list(COMPARISON)
+    if scenario == "Customize your own":
+        plans.append(("You", max(RETIREMENT_AGE - years, 0), initial_amount, monthly_contribution, annual_rate))
+
+    names, ages, initials, monthlies, rates = zip(*plans)
+    horizons = [RETIREMENT_AGE - age for age in ages]
+    with span("compute.comparison"):
+        grid_months, balances, _ = simulate_scenarios(initials, monthlies, rates, horizons)
+
+    figure_span = start_span("figure.build")
+    fig_cmp, ax_cmp = plt.subplots()
+    for name, age, row in zip(names, ages, balances):
+        ax_cmp.plot(age + grid_months / 12, row, label=f"{name} (from age {age})")
+    ax_cmp.set_xlabel("Age", fontsize=12)
+    ax_cmp.set_ylabel("₪", fontsize=12)
+    ax_cmp.set_title(f"Savings at Age {RETIREMENT_AGE}", fontsize=14)
+    ax_cmp.legend(loc='upper left')
+    ax_cmp.grid(True)
+    figure_span.end()
+    with span("render.chart"):
+        st.pyplot(fig_cmp)
+    plt.close(fig_cmp)
+
+    finals = balances[np.arange(len(plans)), horizons]
+    st.markdown("  \n".join(
+        f"**{name}:** ₪{int(final):,} at age {RETIREMENT_AGE}" for name, final in zip(names, finals)
+    ))
 
 # --- Summary ---
 final_gain = balance[-1] - cash_no_interest[-1]
-if scenario.startswith("Eyal"):
-    name = "Eyal"
-elif scenario.startswith("Bar"):
-    name = "Bar"
-elif scenario.startswith("Gal"):
-    name = "Gal"
-else:
-    name = "you"
+name = SCENARIOS[scenario][0] if scenario in SCENARIOS else "you"
 
 st.markdown(f"📌 After **{years} years**, {name} will have **₪{int(balance[-1]):,}**, including **₪{int(final_gain):,}** from compound interest.")
 
 st.caption(f"🕒 That's a total of {months} months of saving and investing.")
 
+# --- What-if Explorer ---
+st.markdown("### 🗺️ What-if Explorer")
+st.markdown("Every square is one plan: when you start and how much you save each month. "
+            "Brighter squares mean more money at age 60.")
+
+if st.checkbox("Show the what-if heatmaps"):
+    start_ages = np.arange(20, 60)                # 40 starting ages
+    monthly_options = np.arange(100, 5001, 100)   # 50 monthly amounts
+    rate_options = {label: rate for label, (rate, _) in INVESTMENT_OPTIONS.items()}
+    monthly_step = monthly_options[1] - monthly_options[0]
+
+    # One broadcasted computation for all 40 x 50 x 3 plans
+    with span("compute.grid"):
+        grid = retirement_grid(start_ages, monthly_options, list(rate_options.values()),
+                               initial=initial_amount, retirement_age=RETIREMENT_AGE)
+
+    tabs = st.tabs([f"{label} ({rate:.0f}%)" for label, rate in rate_options.items()])
+    for i, tab in enumerate(tabs):
+        with tab:
+            figure_span = start_span("figure.build")
+            fig_grid, ax_grid = plt.subplots(figsize=(8, 5))
+            image = ax_grid.imshow(
+                grid[:, :, i] / 1_000_000,
+                origin='lower',
+                aspect='auto',
+                cmap='viridis',
+                # Cell edges half a step either side, so ticks sit on cell centres
+                extent=[monthly_options[0] - monthly_step / 2, monthly_options[-1] + monthly_step / 2,
+                        start_ages[0] - 0.5, start_ages[-1] + 0.5],
+            )
+            fig_grid.colorbar(image, ax=ax_grid, label="Millions of ₪ at age 60")
+            ax_grid.set_xlabel("Monthly contribution (₪)", fontsize=12)
+            ax_grid.set_ylabel("Starting age", fontsize=12)
+            ax_grid.set_title(f"Starting with ₪{initial_amount:,}", fontsize=14)
+            figure_span.end()
+            with span("render.chart"):
+                st.pyplot(fig_grid)
+            plt.close(fig_grid)
+
 # --- Quick Quiz ---
 st.markdown("### ❓ Quick Quiz")
 guess = st.number_input("If you save ₪300/month for 25 years at 7% interest – how much will you have?", min_value=0, step=1000)
@@ -129,3 +188,5 @@ st.markdown("""
 ### 💡 Final Tip
 Compound interest works best when you give it **time**. The earlier you start, the more your money can grow.
 """)
+
+finish_rerun()
@@ -1,13 +1,28 @@
+import copy
+
 import streamlit as st
 import pandas as pd
-import yfinance as yf
+import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime
-import base64
-import json
+from datetime import datetime, timedelta
+
+from algotrade.quotes import get_quote, get_quotes
+from algotrade.portfolio import equity_curve, portfolio_value
+from algotrade.price_store import load_history
+from algotrade.backtest import align_closes
+from algotrade.incremental import extend_stats
+from algotrade.share_codec import decode_share, encode_share
+from algotrade.charts import line_trace
+from algotrade.intraday import load_bars
+from algotrade.persistence import get_portfolio_db
+from algotrade.orders import OrderEngine
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+
+ORDER_BAR = pd.Timedelta(minutes=5)  # resting orders are matched against closed 5-minute bars
 
 # -------------------- Initial Settings --------------------
 st.set_page_config(page_title="Investment Backtesting Tool", layout="wide")
+begin_rerun("trader")
 
 if 'portfolio' not in st.session_state:
     st.session_state.portfolio = {}  # symbol -> {'shares': int, 'cash': float}
@@ -15,46 +30,228 @@ if 'cash' not in st.session_state:
     st.session_state.cash = 1000.0  # Initial cash balance
 if 'history' not in st.session_state:
     st.session_state.history = []  # List of [date, total_value]
+if 'trades' not in st.session_state:
+    st.session_state.trades = []  # Ledger of {'time', 'symbol', 'shares' (negative = sold), 'price'}
+if 'starting_cash' not in st.session_state:
+    st.session_state.starting_cash = st.session_state.cash
+if 'order_engine' not in st.session_state:
+    st.session_state.order_engine = OrderEngine()  # Resting limit / stop orders
 
 # -------------------- Helper Functions --------------------
 def get_stock_price(symbol):
     try:
-        data = yf.Ticker(symbol).history(period="1d")
-        return data['Close'].iloc[-1]
+        with span("fetch.quote"):
+            return get_quote(symbol)
     except Exception:
         return None
 
+def get_stock_prices(symbols):
+    """Latest prices for many symbols in one batched, cached lookup"""
+    try:
+        with span("fetch.quotes"):
+            return get_quotes(symbols)
+    except Exception:
+        return {symbol: None for symbol in symbols}
+
 def update_portfolio_value():
     today = datetime.now().strftime("%Y-%m-%d")
     if st.session_state.history and st.session_state.history[-1][0] == today:
         return  # already updated today
 
-    total_value = st.session_state.cash
-    for symbol, info in st.session_state.portfolio.items():
-        price = get_stock_price(symbol)
-        if price:
-            total_value += price * info['shares']
+    prices = get_stock_prices(list(st.session_state.portfolio))
+    if not all(prices.get(symbol) for symbol in st.session_state.portfolio):
+        return  # a missing quote would count the holding as $0; try again on the next rerun
+    with span("compute.valuation"):
+        total_value = portfolio_value(st.session_state.portfolio, st.session_state.cash, prices)
     st.session_state.history.append([today, round(total_value, 2)])
+    if st.session_state.get('portfolio_id'):
+        with span("store.snapshot"):
+            get_portfolio_db().record_snapshots([(st.session_state.portfolio_id, today, round(total_value, 2))])
 
-def encode_portfolio():
-    data = {
-        'portfolio': st.session_state.portfolio,
-        'cash': st.session_state.cash,
-        'history': st.session_state.history
+def history_stats(dates, values):
+    """Running statistics of the value history.
+
+    Closed days are folded into the session's running state once; today's
+    value moves with every quote, so it is only added to a copy.
+    """
+    closed = int(pd.DatetimeIndex(dates).searchsorted(pd.Timestamp(datetime.now().date())))
+    st.session_state.history_stats = extend_stats(st.session_state.get('history_stats'), values[:closed])
+    stats = copy.copy(st.session_state.history_stats)
+    return stats.update(values[closed:])
+
+def record_trade(symbol, shares, price, time=None):
+    trade = {
+        'time': (time or datetime.now()).isoformat(timespec='seconds'),
+        'symbol': symbol,
+        'shares': shares,
+        'price': price
     }
-    json_str = json.dumps(data)
-    encoded = base64.urlsafe_b64encode(json_str.encode()).decode()
+    st.session_state.trades.append(trade)
+    if st.session_state.get('portfolio_id'):
+        with span("store.trade"):
+            get_portfolio_db().record_trade(st.session_state.portfolio_id, trade, st.session_state.cash)
+
+def buy_shares(symbol, shares, price, time=None):
+    """Buy if there is enough cash; returns whether the trade happened"""
+    price = round(price, 2)  # trade in whole cents, like the ledger and share links store prices
+    total_cost = shares * price
+    if st.session_state.cash < total_cost:
+        return False
+    if symbol in st.session_state.portfolio:
+        st.session_state.portfolio[symbol]['shares'] += shares
+    else:
+        st.session_state.portfolio[symbol] = {'shares': shares, 'cash': 0.0}
+    st.session_state.cash -= total_cost
+    record_trade(symbol, shares, price, time)
+    return True
+
+def sell_shares(symbol, shares, price, time=None):
+    """Sell if enough shares are held; returns whether the trade happened"""
+    price = round(price, 2)
+    if symbol not in st.session_state.portfolio or st.session_state.portfolio[symbol]['shares'] < shares:
+        return False
+    st.session_state.portfolio[symbol]['shares'] -= shares
+    st.session_state.cash += shares * price
+    record_trade(symbol, -shares, price, time)
+    if st.session_state.portfolio[symbol]['shares'] == 0:
+        del st.session_state.portfolio[symbol]
+    return True
+
+def fill_order(order, price):
+    """Order engine callback: trade at the fill price, or refuse the fill"""
+    # Bar times are UTC; the ledger keeps local wall-clock times like record_trade
+    time = order.fill_time.to_pydatetime().astimezone().replace(tzinfo=None) if order.fill_time is not None else None
+    if order.side == 'buy':
+        return buy_shares(order.symbol, order.shares, price, time)
+    return sell_shares(order.symbol, order.shares, price, time)
+
+def process_orders():
+    """Match resting orders against the bars that closed since the last rerun"""
+    engine = st.session_state.order_engine
+    today = datetime.now().date()
+    now = pd.Timestamp.now(tz='UTC')
+    for symbol in engine.symbols_with_orders():
+        book = engine.books[symbol]
+        # last_time is the start of the last processed bar (or a placement time), so the
+        # next bar starts at the following boundary and closes one bar after that
+        if now < book.last_time.floor(ORDER_BAR) + 2 * ORDER_BAR:
+            continue  # no bar can have closed since the last check, so don't even ask for bars
+        try:
+            # load_bars keeps today's bars for one bar interval, so reruns reuse them
+            with span("fetch.order_bars"):
+                bars = load_bars(symbol, book.last_time.date(), today + timedelta(days=1), "5m")
+        except Exception:
+            continue
+        with span("compute.order_matching"):
+            orders = book.open_orders()
+            statuses = [order.status for order in orders]
+            engine.process(symbol, bars, accept=fill_order, until=now - ORDER_BAR)
+        changed = [order for order, status in zip(orders, statuses) if order.status != status]
+        if changed and st.session_state.get('portfolio_id'):
+            with span("store.orders"):
+                get_portfolio_db().update_orders(changed)
+        for order in orders:
+            if order.status == 'filled':
+                st.success(f"Order filled: {order.describe()} at ${order.fill_price:.2f}")
+            elif order.status == 'rejected':
+                st.warning(f"Order could not be filled (not enough cash or shares): {order.describe()}")
+
+def place_order(symbol, side, shares, order_type, limit_price=None, stop_price=None):
+    """Add a resting order, saving it first when the portfolio is saved"""
+    placed = pd.Timestamp.now(tz='UTC')
+    order_id = None
+    if st.session_state.get('portfolio_id'):
+        with span("store.orders"):
+            order_id = get_portfolio_db().add_order(st.session_state.portfolio_id, symbol, side, shares,
+                                                    order_type, limit_price, stop_price, placed.isoformat())
+    return st.session_state.order_engine.place(symbol, side, shares, order_type, limit_price, stop_price,
+                                               placed, order_id=order_id)
+
+def cancel_order(order_id):
+    order = st.session_state.order_engine.cancel(order_id)
+    if order is not None and st.session_state.get('portfolio_id'):
+        get_portfolio_db().update_orders([order])
+
+def load_orders(portfolio_id):
+    """Order engine holding a student's saved open orders"""
+    engine = OrderEngine()
+    for row in get_portfolio_db().open_orders(portfolio_id):
+        engine.place(**row)
+    return engine
+
+def load_student(name):
+    """Switch to a student's saved portfolio, or save the current one under a new name"""
+    db = get_portfolio_db()
+    with span("store.load"):
+        data = db.load_portfolio(name)
+    if data is None:
+        st.session_state.portfolio_id = db.save_portfolio(
+            name, st.session_state.portfolio, st.session_state.cash,
+            st.session_state.trades, st.session_state.starting_cash)
+        for order in st.session_state.order_engine.open_orders():
+            db.add_order(st.session_state.portfolio_id, order.symbol, order.side, order.shares, order.order_type,
+                         order.limit_price, order.stop_price, order.placed.isoformat(), order.status)
+        st.success(f"Saved a new portfolio for {name}.")
+    else:
+        st.session_state.portfolio_id = data['id']
+        st.session_state.portfolio = data['portfolio']
+        st.session_state.cash = data['cash']
+        st.session_state.trades = data['trades']
+        st.session_state.starting_cash = data['starting_cash']
+        st.session_state.history = []
+        st.session_state.pop('history_stats', None)
+        st.success(f"Welcome back, {name}!")
+    st.session_state.order_engine = load_orders(st.session_state.portfolio_id)
+    st.session_state.student = name
+
+def ledger_history():
+    """Daily (dates, values) of the portfolio rebuilt from the trade ledger and stored closes"""
+    trades = st.session_state.trades
+    if not trades:
+        return None
+    symbols = sorted({t['symbol'] for t in trades})
+    first_day = pd.Timestamp(trades[0]['time']).date()
+    today = datetime.now().date()
+    with span("fetch.ledger_closes"):
+        frames = {symbol: load_history(symbol, first_day, today) for symbol in symbols}
+        latest = get_stock_prices(symbols)
+    dates, columns, closes, _ = align_closes(frames)
+    # Finish the curve with today's value at the latest prices
+    if not len(dates) or dates[-1] < pd.Timestamp(today):
+        last = closes[-1] if len(dates) else np.full(len(columns), np.nan)
+        dates = dates.append(pd.DatetimeIndex([pd.Timestamp(today)]))
+        closes = np.vstack([closes.reshape(-1, len(columns)), last])
+    for i, symbol in enumerate(columns):
+        if latest.get(symbol):
+            closes[-1, i] = latest[symbol]
+    # Symbols without any stored closes (e.g. delisted) are valued at their last trade price
+    for symbol in symbols:
+        if symbol not in columns:
+            columns.append(symbol)
+            price = [t['price'] for t in trades if t['symbol'] == symbol][-1]
+            closes = np.column_stack([closes, np.full(len(dates), latest.get(symbol) or price)])
+    with span("compute.equity_curve"):
+        _, _, values = equity_curve(trades, dates, columns, closes, st.session_state.starting_cash)
+    return dates, values
+
+def encode_portfolio():
+    encoded = encode_share(st.session_state.portfolio, st.session_state.cash,
+                           st.session_state.trades, st.session_state.starting_cash)
     return f"{st.request.url}?data={encoded}"
 
 def load_from_url():
     query_params = st.query_params
-    if "data" in query_params:
+    # Decode a link only once per session, not on every rerun
+    if "data" in query_params and st.session_state.get('loaded_link') != query_params["data"]:
+        st.session_state.loaded_link = query_params["data"]
         try:
-            decoded = base64.urlsafe_b64decode(query_params["data"]).decode()
-            data = json.loads(decoded)
+            data = decode_share(query_params["data"])
             st.session_state.portfolio = data.get('portfolio', {})
             st.session_state.cash = data.get('cash', 1000.0)
             st.session_state.history = data.get('history', [])
+            st.session_state.trades = data.get('trades', [])
+            st.session_state.starting_cash = data.get('starting_cash', st.session_state.cash)
+            st.session_state.pop('history_stats', None)
             st.success("Portfolio loaded from URL!")
         except Exception as e:
             st.error(f"Failed to load portfolio: {e}")
@@ -63,37 +260,47 @@ def load_from_url():
 st.title("📈 Investment Backtesting Tool")
 st.markdown("Learn about investing with real data — all pretend!")
 
-load_from_url()
+with span("decode.share_link"):
+    load_from_url()
+process_orders()
 
 with st.sidebar:
     st.header("📦 Manage Portfolio")
+    # Portfolios saved under a name survive the session and show up on the leaderboard
+    student = st.text_input("Your name (to save your portfolio)").strip()
+    if student and student != st.session_state.get('student'):
+        load_student(student)
     symbol = st.text_input("Stock symbol (e.g., AAPL)").upper()
     action = st.radio("Action", ["Buy", "Sell"])
     shares = st.number_input("Shares", min_value=1, value=1)
+    # Market trades happen now; the other order types wait for the price to get there
+    order_type = st.selectbox("Order type", ["Market", "Limit", "Stop", "Stop-Limit"])
+    stop_price = limit_price = None
+    if order_type in ("Stop", "Stop-Limit"):
+        stop_price = st.number_input("Stop price ($)", min_value=0.01, value=100.0)
+    if order_type in ("Limit", "Stop-Limit"):
+        limit_price = st.number_input("Limit price ($)", min_value=0.01, value=100.0)
 
-    if st.button(f"{action} Shares"):
+    if order_type != "Market":
+        if st.button(f"Place {order_type} Order"):
+            if not symbol:
+                st.error("Enter a stock symbol first.")
+            else:
+                order = place_order(symbol, action.lower(), shares, order_type.lower().replace('-', '_'),
+                                    limit_price=limit_price, stop_price=stop_price)
+                st.success(f"Order placed: {order.describe()}")
+    elif st.button(f"{action} Shares"):
         price = get_stock_price(symbol)
         if price is None:
             st.error("Invalid stock symbol or data unavailable.")
         else:
             if action == "Buy":
-                total_cost = shares * price
-                if st.session_state.cash >= total_cost:
-                    if symbol in st.session_state.portfolio:
-                        st.session_state.portfolio[symbol]['shares'] += shares
-                    else:
-                        st.session_state.portfolio[symbol] = {'shares': shares, 'cash': 0.0}
-                    st.session_state.cash -= total_cost
+                if buy_shares(symbol, shares, price):
                     st.success(f"Bought {shares} shares of {symbol} at ${price:.2f}")
                 else:
                     st.warning("Not enough cash to complete the purchase.")
             elif action == "Sell":
-                if symbol in st.session_state.portfolio and st.session_state.portfolio[symbol]['shares'] >= shares:
-                    st.session_state.portfolio[symbol]['shares'] -= shares
-                    proceeds = shares * price
-                    st.session_state.cash += proceeds
-                    if st.session_state.portfolio[symbol]['shares'] == 0:
-                        del st.session_state.portfolio[symbol]
+                if sell_shares(symbol, shares, price):
                     st.success(f"Sold {shares} shares of {symbol} at ${price:.2f}")
                 else:
                     st.warning("Not enough shares to sell.")
@@ -104,14 +311,30 @@ with st.sidebar:
         link = encode_portfolio()
         st.code(link)
 
+# -------------------- Open Orders --------------------
+open_orders = st.session_state.order_engine.open_orders()
+if open_orders:
+    st.subheader("⏳ Open Orders")
+    st.table(pd.DataFrame([{
+        "Order": order.describe(),
+        "Status": "Waiting for limit" if order.status == 'triggered' else "Waiting",
+        "Placed": order.placed.tz_convert(None).strftime("%Y-%m-%d %H:%M") + " UTC",
+    } for order in open_orders]))
+    col1, col2 = st.columns([3, 1])
+    to_cancel = col1.selectbox("Cancel an order", open_orders, format_func=lambda order: order.describe())
+    if col2.button("Cancel Order"):
+        cancel_order(to_cancel.id)
+        st.rerun()
+
 # -------------------- Portfolio Summary --------------------
 st.subheader("📊 Portfolio Overview")
 if not st.session_state.portfolio:
     st.info("No stocks in your portfolio yet.")
 else:
     rows = []
+    prices = get_stock_prices(list(st.session_state.portfolio))
     for symbol, info in st.session_state.portfolio.items():
-        price = get_stock_price(symbol)
+        price = prices.get(symbol)
         value = round(price * info['shares'], 2) if price else 0
         rows.append({
             "Symbol": symbol,
@@ -120,19 +343,63 @@ else:
             "Value": f"${value:.2f}"
         })
     df = pd.DataFrame(rows)
-    st.table(df)
+    with span("render.table"):
+        st.table(df)
+
+    # Recent intraday moves of one holding
+    st.subheader("🕒 Recent Price Moves")
+    col1, col2 = st.columns(2)
+    chart_symbol = col1.selectbox("Stock", list(st.session_state.portfolio))
+    bar_size = col2.radio("Bar size", ["5m", "15m", "1h"], horizontal=True)
+    today = datetime.now().date()
+    try:
+        with span("fetch.intraday"):
+            bars = load_bars(chart_symbol, today - timedelta(days=5), today + timedelta(days=1), bar_size)
+    except Exception:
+        bars = None
+    if bars is None or bars.empty:
+        st.info(f"No intraday prices for {chart_symbol} right now.")
+    else:
+        figure_span = start_span("figure.build")
+        fig_bars = go.Figure()
+        fig_bars.add_trace(line_trace(
+            bars.index,
+            bars['Close'],
+            mode='lines',
+            name=chart_symbol
+        ))
+        fig_bars.update_layout(
+            xaxis_title="Time",
+            yaxis_title="Price ($)",
+            height=300
+        )
+        figure_span.end()
+        with span("render.chart"):
+            st.plotly_chart(fig_bars, use_container_width=True)
 
 # -------------------- Update & Plot --------------------
 update_portfolio_value()
 
 st.subheader("📈 Portfolio Value Over Time")
-if st.session_state.history:
-    df_hist = pd.DataFrame(st.session_state.history, columns=["Date", "Value"])
+# With a trade ledger every trading day is rebuilt from stored closes; older
+# shared portfolios without one fall back to the daily snapshots
+try:
+    ledger = ledger_history()
+except Exception:
+    ledger = None
+if ledger is not None:
+    hist_dates, hist_values = ledger
+else:
+    hist_dates = [day for day, _ in st.session_state.history]
+    hist_values = [value for _, value in st.session_state.history]
+
+if len(hist_values):
+    figure_span = start_span("figure.build")
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_hist["Date"],
-        y=df_hist["Value"],
-        mode='lines+markers',
+    fig.add_trace(line_trace(
+        hist_dates,
+        hist_values,
+        mode='lines+markers' if ledger is None else 'lines',
         name="Total Value"
     ))
     fig.update_layout(
@@ -140,6 +407,17 @@ if st.session_state.history:
         yaxis_title="Portfolio Value ($)",
         height=400
     )
-    st.plotly_chart(fig, use_container_width=True)
+    figure_span.end()
+    with span("render.chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    with span("compute.history_stats"):
+        stats = history_stats(hist_dates, np.asarray(hist_values, dtype=float))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Highest Value", f"${stats.high:,.2f}")
+    col2.metric("Biggest Drop", f"{stats.max_drawdown * 100:.1f}%")
+    col3.metric("Ups and Downs (volatility)", f"{stats.volatility():.1f}%")
 else:
     st.info("No portfolio history to display yet.")
+
+finish_rerun()
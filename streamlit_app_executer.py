@@ -2,6 +2,9 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 
+from algotrade.instrumentation import begin_rerun, finish_rerun, span, start_span
+from algotrade.warmup import start_background_warmup
+
 # Page configuration
 st.set_page_config(
     page_title="AlgoTrade Learning Platform",
@@ -10,7 +13,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+begin_rerun("home")
+# Preload every ticker the pages offer so the first visitor of the day doesn't wait
+start_background_warmup()
+
 # Simple CSS for kid-friendly design
+html_span = start_span("render.html")
 st.markdown("""
 <style>
     .main-header {
@@ -130,10 +138,13 @@ st.markdown("""
 Don't worry - this is all pretend money, so you can't lose anything real!
 """)
 
+html_span.end()
+
 # Simple example chart
 st.markdown('<h2 class="section-header">📊 Example: How Stock Prices Change</h2>', unsafe_allow_html=True)
 
 # Create a simple, colorful example
+figure_span = start_span("figure.build")
 days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 prices = [10, 12, 11, 15, 13]
 
@@ -156,11 +167,15 @@ fig.update_layout(
     font=dict(size=14)
 )
 
-st.plotly_chart(fig, use_container_width=True)
+figure_span.end()
+
+with span("render.chart"):
+    st.plotly_chart(fig, use_container_width=True)
 
 st.markdown("See how the price goes up and down? That's normal for stocks!")
 
 # Learning goals
+html_span = start_span("render.html")
 st.markdown('<h2 class="section-header">🎯 What You\'ll Discover</h2>', unsafe_allow_html=True)
 
 col1, col2, col3 = st.columns(3)
@@ -195,3 +210,6 @@ st.markdown("""
 
 Made with ❤️ for young learners | Data from Yahoo Finance
 """)
+html_span.end()
+
+finish_rerun()
@@ -0,0 +1,53 @@
+"""Running statistics folded in chunks agree with the full-series computations"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from algotrade.analysis import calculate_returns, day_clock
+from algotrade.drawdown import drawdown_analysis
+from algotrade.incremental import extend_stats
+
+
+def grow(prices, clock, rng):
+    """Extend one RunningStats over growing prefixes, like a moving end date"""
+    stats, end = None, 0
+    while end < len(prices):
+        end = min(len(prices), end + int(rng.integers(1, 60)))
+        stats = extend_stats(stats, prices[:end], clock[:end])
+    return stats
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_chunked_matches_full_series(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 400))
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    if seed % 2:
+        prices = np.round(prices / 5) * 5  # repeated highs
+    index = pd.bdate_range('2020-01-01', periods=n)
+    stats = grow(prices, day_clock(index), rng)
+
+    expected = drawdown_analysis(prices, index)
+    for key, value in stats.drawdown(index).items():
+        assert value == pytest.approx(expected[key]) if isinstance(value, float) else value == expected[key]
+    returns = prices[1:] / prices[:-1] - 1
+    assert stats.volatility() == pytest.approx(np.std(returns, ddof=1) * np.sqrt(252) * 100)
+    assert stats.downside_sq == pytest.approx(np.sum(np.minimum(returns, 0) ** 2))
+    assert (stats.high, stats.low, stats.days) == (prices.max(), prices.min(), n)
+
+
+def test_calculate_returns_with_running_stats():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2015-01-01', periods=1500)
+    data = pd.DataFrame({'Close': 50 * np.exp(np.cumsum(rng.normal(0, 0.015, len(index))))}, index=index)
+    benchmark = pd.Series(80 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index)))), index=index)
+    stats = grow(data['Close'].to_numpy(), day_clock(index), rng)
+
+    full = calculate_returns(data, 1000, benchmark)
+    running = calculate_returns(data, 1000, benchmark, stats=stats)
+    for key in ('max_price', 'min_price', 'volatility', 'days_held', 'final_value'):
+        assert running[key] == pytest.approx(full[key])
+    for key in ('sharpe', 'sortino', 'calmar', 'max_drawdown', 'beta', 'var'):
+        assert running['metrics'][key] == pytest.approx(full['metrics'][key])
+    assert running['drawdown']['trough_date'] == full['drawdown']['trough_date']
+    np.testing.assert_allclose(running['drawdown']['underwater'], full['drawdown']['underwater'])
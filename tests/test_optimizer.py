@@ -0,0 +1,28 @@
+"""SMA sweep over a mixed stock/crypto matrix keeps each asset on its own calendar"""
+import numpy as np
+import pandas as pd
+
+from algotrade.backtest import align_closes
+from algotrade.optimizer import sma_sweep
+
+WINDOWS = range(5, 61, 5)
+KEY = ['Symbol', 'Fast', 'Slow']
+STATS = ['Return %', 'Sharpe', 'Max Drawdown %', 'Trades']
+
+
+def test_mixed_calendars_match_separate_sweeps():
+    rng = np.random.default_rng(3)
+    days = pd.date_range('2020-01-01', periods=600, freq='D')
+    weekdays = days[days.dayofweek < 5]
+    stock = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(weekdays)))), index=weekdays)
+    coin = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.03, len(days)))), index=days)
+
+    _, symbols, prices, observed = align_closes({'STK': stock, 'BTC-USD': coin})
+    mixed = sma_sweep(prices, symbols, observed, windows=WINDOWS, periods_per_year=[252, 365])
+
+    for symbol, series, periods in (('STK', stock, 252), ('BTC-USD', coin, 365)):
+        alone = sma_sweep(series.to_numpy()[:, None], [symbol], windows=WINDOWS, periods_per_year=periods)
+        got = mixed[mixed['Symbol'] == symbol].sort_values(KEY).reset_index(drop=True)
+        expected = alone.sort_values(KEY).reset_index(drop=True)
+        assert len(got) == len(expected)
+        np.testing.assert_allclose(got[STATS].to_numpy(float), expected[STATS].to_numpy(float))
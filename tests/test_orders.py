@@ -0,0 +1,128 @@
+"""Order book matching checked against a plain per-order, per-bar loop"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from algotrade.orders import OrderEngine
+
+BAR = pd.Timedelta(minutes=5)
+
+
+def make_bars(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[100, close[:-1]] * (1 + rng.normal(0, 0.003, n))
+    high = np.maximum(open_, close) * (1 + abs(rng.normal(0, 0.004, n)))
+    low = np.minimum(open_, close) * (1 - abs(rng.normal(0, 0.004, n)))
+    index = pd.date_range('2025-01-02 14:30', periods=n, freq='5min', tz='UTC')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close}, index=index)
+
+
+def reference_fill(spec, bars):
+    """(time, price) of the bar that fills ``spec``, walking every bar after it was placed"""
+    live = spec['type'] == 'limit'
+    for time, open_, high, low in zip(bars.index, bars['Open'].to_numpy(), bars['High'].to_numpy(),
+                                      bars['Low'].to_numpy()):
+        if time <= spec['placed']:
+            continue
+        start = open_
+        if not live:
+            if spec['side'] == 'buy' and high >= spec['stop']:
+                start = max(open_, spec['stop'])
+            elif spec['side'] == 'sell' and low <= spec['stop']:
+                start = min(open_, spec['stop'])
+            else:
+                continue
+            if spec['type'] == 'stop':
+                return time, start
+            live = True
+        if spec['side'] == 'buy' and low <= spec['limit']:
+            return time, min(start, spec['limit'])
+        if spec['side'] == 'sell' and high >= spec['limit']:
+            return time, max(start, spec['limit'])
+    return None
+
+
+def test_matches_reference_loop():
+    bars = make_bars()
+    engine = OrderEngine()
+    specs = {}
+    rng = random.Random(0)
+    # Most orders rest from the start, some arrive while bars are being processed
+    placements = sorted(bars.index[0] - pd.Timedelta(minutes=1) if rng.random() < 0.8 else
+                        bars.index[rng.randrange(len(bars))] + pd.Timedelta(minutes=2) for _ in range(3000))
+    for placed in placements:
+        side = rng.choice(['buy', 'sell'])
+        order_type = rng.choice(['limit', 'stop', 'stop_limit'])
+        limit = 100 * rng.uniform(0.85, 1.15) if order_type != 'stop' else None
+        stop = 100 * rng.uniform(0.85, 1.15) if order_type != 'limit' else None
+        order = engine.place('SYN', side, 1, order_type, limit_price=limit, stop_price=stop, placed=placed)
+        specs[order.id] = dict(side=side, type=order_type, limit=limit, stop=stop, placed=placed)
+    for order_id in range(1, len(specs) + 1, 7):
+        engine.cancel(order_id)
+
+    # Feed the bars in chunks, the way reruns see them arrive
+    for end in range(50, len(bars) + 50, 50):
+        engine.process('SYN', bars.iloc[:end])
+
+    for order_id, order in engine.orders.items():
+        expected = None if order_id % 7 == 1 else reference_fill(specs[order_id], bars)
+        if expected is None:
+            assert order.status != 'filled'
+        else:
+            assert order.status == 'filled'
+            assert order.fill_time == expected[0]
+            assert order.fill_price == pytest.approx(expected[1])
+
+
+def test_stop_limit_gap():
+    engine = OrderEngine()
+    index = pd.date_range('2025-01-02 14:30', periods=2, freq='5min', tz='UTC')
+    bars = pd.DataFrame({'Open': [100.0, 103.0], 'High': [101.0, 104.0], 'Low': [99.0, 102.0]}, index=index)
+    gapped = engine.place('SYN', 'buy', 1, 'stop_limit', limit_price=103.5, stop_price=102.0,
+                          placed=index[0] - BAR)
+    engine.process('SYN', bars)
+    # The second bar opens above the stop, so the order goes live at the open
+    assert gapped.status == 'filled' and gapped.fill_price == 103.0
+
+
+def test_forming_bar_is_left_for_later():
+    index = pd.date_range('2025-01-02 14:30', periods=3, freq='5min', tz='UTC')
+    bars = pd.DataFrame({'Open': [100.0, 100.0, 100.0], 'High': [101.0, 101.0, 101.0],
+                         'Low': [99.0, 99.0, 97.0]}, index=index)
+    engine = OrderEngine()
+    order = engine.place('SYN', 'buy', 1, 'limit', limit_price=98.0, placed=index[0] - BAR)
+    forming = bars.copy()
+    forming.iloc[2, forming.columns.get_loc('Low')] = 99.5
+    engine.process('SYN', forming, until=index[1])
+    assert engine.books['SYN'].last_time == bars.index[1]
+    # Once closed, the bar reaches its final low and fills the order
+    engine.process('SYN', bars)
+    assert order.status == 'filled' and order.fill_time == bars.index[2]
+
+
+def test_placing_does_not_skip_bars_for_resting_orders():
+    index = pd.date_range('2025-01-02 14:30', periods=3, freq='5min', tz='UTC')
+    bars = pd.DataFrame({'Open': [100.0, 100.0, 100.0], 'High': [101.0, 103.0, 101.0],
+                         'Low': [99.0, 99.0, 99.0]}, index=index)
+    engine = OrderEngine()
+    resting = engine.place('SYN', 'sell', 1, 'limit', limit_price=102.0, placed=index[0] - BAR)
+    engine.process('SYN', bars.iloc[:1])
+    late = engine.place('SYN', 'buy', 1, 'limit', limit_price=1e9, placed=bars.index[2] + pd.Timedelta(minutes=1))
+    engine.process('SYN', bars)
+    assert resting.status == 'filled' and resting.fill_time == bars.index[1]
+    assert late.status == 'open'
+
+
+def test_restore_and_reject():
+    bars = make_bars(20)
+    bars.index = bars.index.tz_localize(None)
+    engine = OrderEngine()
+    order = engine.place('x', 'buy', 1, 'limit', limit_price=1e9, placed='2025-01-01', order_id=41,
+                         status='open')
+    assert engine.place('x', 'sell', 1, 'stop', stop_price=1.0).id == 42
+    engine.process('X', bars, accept=lambda order, price: False)
+    assert order.status == 'rejected' and order.fill_price is None
+    assert [o.id for o in engine.open_orders()] == [42]
@@ -0,0 +1,46 @@
+"""Share-link encoding: version-2 round trip and version-1 compatibility"""
+import base64
+import json
+
+import pytest
+
+from algotrade.share_codec import _write_varint, decode_share, encode_share
+
+PORTFOLIO = {'AAPL': {'shares': 3, 'cash': 0.0}, 'MSFT': {'shares': 1, 'cash': 0.0}}
+TRADES = [
+    {'time': '2024-03-01T10:15:00', 'symbol': 'AAPL', 'shares': 5, 'price': 180.37},
+    {'time': '2024-03-04T14:02:00', 'symbol': 'MSFT', 'shares': 1, 'price': 402.11},
+    {'time': '2024-03-05T09:31:00', 'symbol': 'AAPL', 'shares': -2, 'price': 175.9},
+]
+STARTING_CASH = 1000.0
+CASH = STARTING_CASH - sum(t['shares'] * t['price'] for t in TRADES)
+
+
+def test_round_trip():
+    data = decode_share(encode_share(PORTFOLIO, CASH, TRADES, STARTING_CASH))
+    assert data['portfolio'] == PORTFOLIO
+    assert data['trades'] == TRADES
+    assert data['starting_cash'] == STARTING_CASH
+    assert data['cash'] == pytest.approx(CASH, abs=1e-9)
+
+
+def test_cash_matches_ledger():
+    data = decode_share(encode_share(PORTFOLIO, CASH, TRADES, STARTING_CASH))
+    rebuilt = data['starting_cash'] - sum(t['shares'] * t['price'] for t in data['trades'])
+    assert round(rebuilt, 2) == data['cash']
+
+
+def test_empty_portfolio():
+    data = decode_share(encode_share({}, 1000.0))
+    assert data == {'portfolio': {}, 'cash': 1000.0, 'starting_cash': 1000.0, 'trades': []}
+
+
+def test_version_1_link():
+    legacy = {'portfolio': PORTFOLIO, 'cash': 123.45, 'history': [['2024-03-01', 1000.0]]}
+    text = base64.urlsafe_b64encode(json.dumps(legacy).encode()).decode()
+    assert decode_share(text) == legacy
+
+
+def test_negative_varint():
+    with pytest.raises(ValueError):
+        _write_varint(bytearray(), -1)